@@ -0,0 +1,180 @@
+import numpy as np
+from observables import ObservableSeries
+
+# Cluster and droplet analysis shared by glauber-phase-sampler.py, glauber-dynamics.py and kawasaki-dynamics.py.
+# Clusters are groups of molecules joined through nearest neighbors. A cluster spans the grid if it
+# touches two opposite (open) edges; a droplet is a cluster that does not span and holds at least
+# DROPLET_MIN_SIZE molecules, so the odd vapor molecules and pairs are not counted as droplets
+
+DROPLET_MIN_SIZE = 4
+CLUSTER_FIELDS = ("sweep", "clusters", "droplets", "largest_fraction", "percolating") # of a record of cluster summaries
+
+def union_find_labels(nodes, a, b):
+    """
+    Connected components of nodes 0..nodes-1 joined by edges a[i]-b[i], as the root of each node.
+    Vectorized union-find: hook every edge's larger root onto its smaller root, then compress
+    paths by pointer jumping, until no edge joins two different roots.
+    """
+    parent = np.arange(nodes)
+    while True:
+        root_a, root_b = parent[a], parent[b]
+        joined = root_a != root_b
+        if not joined.any():
+            return parent
+        np.minimum.at(parent, np.maximum(root_a, root_b)[joined], np.minimum(root_a, root_b)[joined])
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+
+def label_clusters(grid):
+    """
+    Label the clusters of molecules of a grid. The horizontal runs of molecules are numbered with
+    a cumulative sum, then union_find_labels joins the runs that touch vertically, which leaves
+    far fewer nodes than one per cell. Every molecule gets the index (row * width + col) of its
+    cluster's root cell, the first cell of one of its runs, and every empty cell -1.
+    """
+    occupied = np.asarray(grid, dtype=bool)
+    height, width = occupied.shape
+    starts = occupied.copy()
+    starts[:, 1:] &= ~occupied[:, :-1]
+    run = np.cumsum(starts.ravel()).reshape(height, width) - 1
+    first = np.flatnonzero(starts)
+    down = occupied[:-1, :] & occupied[1:, :]
+    roots = union_find_labels(len(first), run[:-1, :][down], run[1:, :][down])
+    labels = np.full((height, width), -1)
+    labels[occupied] = first[roots[run[occupied]]]
+    return labels
+
+class ClusterStats:
+    """
+    The clusters of one lattice: their sizes, largest first, and whether each spans the grid.
+    largest_fraction is the largest cluster's share of all cells, an order parameter that stays
+    near 0 in the vapor and approaches the density in the liquid.
+    """
+    def __init__(self, sizes, spanning, cells):
+        order = np.argsort(sizes, kind="stable")[::-1]
+        self.sizes = sizes[order]
+        self.spanning = spanning[order]
+        self.clusters = len(sizes)
+        self.largest_fraction = float(self.sizes[0] / cells) if self.clusters else 0.0
+        self.percolating = bool(self.spanning.any())
+        self.droplets = int(np.count_nonzero((self.sizes >= DROPLET_MIN_SIZE) & ~self.spanning))
+
+    def distribution(self):
+        """No. of clusters of each size s, at index s"""
+        return np.bincount(self.sizes)
+
+    def summary(self):
+        """(clusters, droplets, largest_fraction, percolating), as in CLUSTER_FIELDS"""
+        return self.clusters, self.droplets, self.largest_fraction, self.percolating
+
+def cluster_stats(grid):
+    """ClusterStats of a grid, labelled in one vectorized pass"""
+    labels = label_clusters(grid)
+    roots, sizes = np.unique(labels[labels >= 0], return_counts=True)
+    spanning = np.isin(roots, np.intersect1d(labels[0], labels[-1])) | \
+        np.isin(roots, np.intersect1d(labels[:, 0], labels[:, -1]))
+    return ClusterStats(sizes, spanning, labels.size)
+
+class ClusterTracker:
+    """
+    Clusters of a list-of-lists grid kept up to date flip by flip, for single-flip dynamics.
+    add(row, col), called once a cell has gained a molecule, merges it with its neighbors' clusters
+    by union-find (union by size, path halving) and updates the no. of clusters and droplets, the
+    largest size and the no. of spanning clusters, so summary() costs nothing between removals.
+    Every cluster root also keeps a bit mask of the grid edges its cluster touches.
+    A removal can split a cluster, which union-find cannot undo, so remove() only marks the tracker
+    stale and the next summary() relabels the whole grid with label_clusters.
+    """
+    def __init__(self, grid):
+        self.grid = grid
+        self.height = len(grid)
+        self.width = len(grid[0])
+        rows, cols = np.divmod(np.arange(self.height * self.width), self.width)
+        # 1: top, 2: bottom, 4: left, 8: right
+        self.cell_edges = (1 * (rows == 0) | 2 * (rows == self.height - 1) |
+                           4 * (cols == 0) | 8 * (cols == self.width - 1))
+        self.rebuild()
+
+    def rebuild(self):
+        """Relabel the grid from scratch"""
+        labels = label_clusters(self.grid).ravel()
+        occupied = labels >= 0
+        size = np.bincount(labels[occupied], minlength=labels.size)
+        edges = np.zeros(labels.size, dtype=np.int64)
+        np.bitwise_or.at(edges, labels[occupied], self.cell_edges[occupied])
+
+        roots = size > 0
+        spans = ((edges & 3) == 3) | ((edges & 12) == 12)
+        self.clusters = int(np.count_nonzero(roots))
+        self.spanning = int(np.count_nonzero(roots & spans))
+        self.droplets = int(np.count_nonzero(roots & ~spans & (size >= DROPLET_MIN_SIZE)))
+        self.largest = int(size.max())
+        self.parent = np.where(occupied, labels, np.arange(labels.size)).tolist()
+        self.size = size.tolist()
+        self.edges = edges.tolist()
+        self.stale = False
+
+    def _find(self, index):
+        parent = self.parent
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    def _tally(self, root, sign):
+        """Add (sign 1) or take away (sign -1) the cluster at root from the droplet and spanning counts"""
+        edges = self.edges[root]
+        if (edges & 3) == 3 or (edges & 12) == 12:
+            self.spanning += sign
+        elif self.size[root] >= DROPLET_MIN_SIZE:
+            self.droplets += sign
+
+    def add(self, row, col):
+        if self.stale:
+            return
+        root = row * self.width + col
+        self.parent[root] = root
+        self.size[root] = 1
+        self.edges[root] = int(self.cell_edges[root])
+        self.clusters += 1
+        self._tally(root, 1)
+
+        grid = self.grid
+        for r, c in ((row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1)):
+            if not (0 <= r < self.height and 0 <= c < self.width and grid[r][c]):
+                continue
+            other = self._find(r * self.width + c)
+            if other == root:
+                continue
+            self._tally(root, -1)
+            self._tally(other, -1)
+            if self.size[root] < self.size[other]:
+                root, other = other, root
+            self.parent[other] = root
+            self.size[root] += self.size[other]
+            self.edges[root] |= self.edges[other]
+            self.clusters -= 1
+            self._tally(root, 1)
+        self.largest = max(self.largest, self.size[root])
+
+    def remove(self, row, col):
+        self.stale = True
+
+    def summary(self):
+        """(clusters, droplets, largest_fraction, percolating), as in CLUSTER_FIELDS"""
+        if self.stale:
+            self.rebuild()
+        return self.clusters, self.droplets, self.largest / (self.height * self.width), self.spanning > 0
+
+def cluster_text(summary):
+    """A cluster summary as one line for the canvas"""
+    clusters, droplets, largest_fraction, percolating = summary
+    return (f"{droplets} droplets, {clusters} clusters, largest {largest_fraction:.1%}"
+            + (", percolating" if percolating else ""))
+
+class ClusterSeries(ObservableSeries):
+    """Ring buffer of cluster summaries, one per published frame"""
+    FIELDS = CLUSTER_FIELDS
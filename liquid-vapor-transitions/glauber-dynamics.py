@@ -1,9 +1,20 @@
 import tkinter as tk
 import time
 import numpy as np
-import random
 import math
+import functools
+import os
 from PIL import Image, ImageTk
+from instruments import Instruments
+from trajectory import TrajectoryWriter, Trajectory
+from random_stream import RandomStream
+from lattice import count_neighbors_at
+from nfold import NFoldWay
+from observables import ObservableSeries
+from clusters import ClusterSeries, ClusterTracker, cluster_stats, cluster_text
+from phase_store import load_store, store_raster
+from lattice_view import (TARGET_FPS, hex_to_rgb, LatticeRenderer, save_lattice, load_lattice,
+                          SimulationWorker)
 
 # --- Grid Constants ---
 GRID_WIDTH = 40     # Number of cells horizontally
@@ -20,6 +31,44 @@ POTENTIAL_INIT = -3.0
 POTENTIAL_MAX = -1.0
 POTENTIAL_MIN = -3.0
 
+# --- Dynamics ---
+# "metropolis": glauber_dynamics(), one random proposal per step
+# "nfold": NFoldWay, one accepted flip per step with no rejected proposals; a sweep is one sweep of its clock,
+# so it only pays off at low temperature, where most Metropolis proposals are rejected
+DYNAMICS = ("metropolis", "nfold")
+DYNAMICS_INIT = "metropolis"
+
+# --- Random Numbers ---
+SEED = None # seed of the simulation's RandomStream; None for a different run every time
+
+# --- Instrumentation ---
+# Off by default. When on, the simulation counts proposals and accepted moves, the worker and the
+# GUI time each phase, and a HUD on the canvas shows the rates every STATS_INTERVAL seconds
+INSTRUMENT = False
+STATS_EXPORT = None # file to stream the HUD figures to: CSV if it ends in ".csv", otherwise JSON lines
+STATS_INTERVAL = 1.0
+MOVES = ("add", "remove") # accepted moves are counted by type
+PHASES = ("messages", "sweeps", "publish", "draw") # worker: messages, sweeps, publish; GUI: draw
+
+# --- Trajectories ---
+# RECORD names a directory to record the run to as a trajectory, one frame every RECORD_INTERVAL sweeps;
+# REPLAY names a recorded trajectory to scrub through instead of simulating
+RECORD = None
+RECORD_INTERVAL = 1
+REPLAY = None
+
+# --- Cluster Analysis ---
+# Off by default. When on, the simulation keeps its clusters of molecules with a ClusterTracker and
+# the canvas shows the no. of droplets, the largest cluster's share of the grid and whether some
+# cluster spans it, updated with every frame. A droplet is a cluster of at least clusters.py's
+# DROPLET_MIN_SIZE molecules that does not touch two opposite edges
+CLUSTERS = False
+
+# --- Saved Lattices ---
+# The Save and Load buttons write the worker's current lattice to LATTICE_FILE, with its temperature, potential and
+# sweep, and read it back, so an equilibrated state can be picked up again instead of re-equilibrated
+LATTICE_FILE = "lattice.npz"
+
 # Colors
 WHITE = "#ffffff" 
 BLACK = "#000000"
@@ -27,6 +76,15 @@ GRID_LINE_COLOR = "#c8c8c8"
 CELL_COLOR = "#34cfeb" 
 KNOB_COLOR = "#e63946"
 
+# --- Rendering ---
+RENDER_MODE = "full" # one of lattice_view.py's RENDER_MODES
+
+# --- Phase Diagram Background ---
+# The 2D slider shows the phase diagram from glauber-phase-sampler.py's result store, or PHASE_DIAGRAM_IMAGE
+# until the store holds every point of a STORE_RESOLUTION diagram sampled with STORE_ENGINE on this grid's size
+PHASE_DIAGRAM_IMAGE = "sampled-phase-diagram.png"
+DIAGRAM_COLORS = ["#f7fbff", "#c6dbef", "#6baed6", "#2171b5", "#08306b"] # light (vapor) to dark (liquid)
+
 class Coordinate:
     def __init__(self, x_coord, y_coord):
         self.x = x_coord
@@ -36,7 +94,7 @@ def total_energy(g):
         energy = 0
         for row in range(GRID_HEIGHT):
             for col in range(GRID_WIDTH):
-                energy += count_neighbors(Coordinate(row,col),g)
+                energy += count_neighbors(Coordinate(col,row),g)
         return -1 * energy / 2
 
 def count_neighbors(coord, g):
@@ -78,26 +136,252 @@ def nonselective_count_neighbors(coord, g):
         return count
 
 
+def phase_diagram_image(raster, width, height):
+    """
+    width x height image of a store_raster over the slider's (temperature, potential) area; each
+    point of the raster colors the block from its temperature and potential up to the next point's
+    """
+    resolution = len(raster)
+    cols = ((np.arange(width) + 0.5) / width * resolution).astype(int)
+    rows = ((np.arange(height) + 0.5) / height * resolution).astype(int)
+    density = raster[rows[:, None], cols[None, :]]
+
+    stops = np.linspace(0, 1, len(DIAGRAM_COLORS))
+    colors = np.array([hex_to_rgb(color) for color in DIAGRAM_COLORS])
+    pixels = np.stack([np.interp(density, stops, colors[:, i]) for i in range(3)], axis=-1)
+    return Image.fromarray(pixels.astype(np.uint8))
+
+class LatticeSimulation:
+    """
+    The headless simulation core: grid, observables and dynamics, with no Tk involved.
+    Temperature and potential are plain attributes changed through set_parameters.
+    """
+    def __init__(self, temperature=TEMP_INIT, potential=POTENTIAL_INIT, dynamics=DYNAMICS_INIT, instruments=None,
+                 seed=SEED, clusters=CLUSTERS):
+        # --- Grid Data Structure ---
+        # Start with an empty grid
+        self.grid = [[0 for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
+
+        # --- Observables ---
+        # Kept up to date from the delta of every accepted move instead of rescanning the grid
+        self.mol_num = 0
+        self.bonds = 0 # no. of neighboring molecule pairs
+        self.sweep = 0
+        self.series = ObservableSeries()
+        self.instruments = instruments if instruments is not None else Instruments(MOVES, PHASES, enabled=False)
+
+        # --- Clusters ---
+        # Followed flip by flip; summarized into cluster_series whenever record_clusters is called
+        self.clusters = ClusterTracker(self.grid) if clusters else None
+        self.cluster_series = ClusterSeries()
+
+        # --- Dynamics ---
+        self.temperature = temperature
+        self.potential = potential
+        self.dynamics = dynamics
+        self.rng = RandomStream(GRID_WIDTH * GRID_HEIGHT, seed)
+        self.nfold = None
+        if self.dynamics == "nfold":
+            self.nfold = NFoldWay(self.grid, temperature, potential, self.rng)
+
+    def set_parameters(self, temperature, potential):
+        self.temperature = temperature
+        self.potential = potential
+
+    """Toggles the state of a cell, keeping the observables up to date."""
+    def toggle_cell(self, row, col):
+        neighbors = nonselective_count_neighbors(Coordinate(col, row), self.grid)
+        if self.grid[row][col] == 0:
+            self.mol_num += 1
+            self.bonds += neighbors
+        else:
+            self.mol_num -= 1
+            self.bonds -= neighbors
+        self.grid[row][col] = 1 - self.grid[row][col]
+        if self.nfold is not None:
+            self.nfold.cell_changed(row, col)
+        if self.clusters is not None:
+            self._track_clusters(row, col)
+
+    """Tells the cluster tracker about a flipped cell: merges on additions, marks it stale on removals."""
+    def _track_clusters(self, row, col):
+        if self.grid[row][col]:
+            self.clusters.add(row, col)
+        else:
+            self.clusters.remove(row, col)
+
+    """Appends the current cluster summary to cluster_series and returns it, or None if clusters are not tracked."""
+    def record_clusters(self):
+        if self.clusters is None:
+            return None
+        summary = self.clusters.summary()
+        self.cluster_series.append(self.sweep, *summary)
+        return summary
+
+    """Writes the grid, temperature, potential and sweep to an .npz file, through a temporary file renamed into place."""
+    def save(self, path):
+        save_lattice(path, self.grid, temperature=self.temperature, potential=self.potential, sweep=self.sweep)
+
+    """Replaces the cells of the grid with those of a saved lattice and recounts everything kept from them."""
+    def load_grid(self, cells, sweep=0):
+        for row, values in zip(self.grid, np.asarray(cells).tolist()):
+            row[:] = values
+        self.mol_num = sum(map(sum, self.grid))
+        self.bonds = int(-total_energy(self.grid))
+        self.sweep = sweep
+        if self.nfold is not None:
+            self.nfold = NFoldWay(self.grid, self.temperature, self.potential, self.rng)
+            self.nfold.clock = float(sweep)
+        if self.clusters is not None:
+            self.clusters.rebuild()
+
+    """Energy of the current grid, -bonds - potential * mol_num, in O(1)."""
+    def energy(self):
+        return -self.bonds - self.potential * self.mol_num
+
+    """Return a random 0-indexed cell (row, col) on the grid"""
+    def random_cell(self):
+        return divmod(self.rng.site(), GRID_WIDTH)
+
+    def glauber_dynamics(self):
+        temperature = self.temperature
+        if temperature <= 0: return
+
+        potential = self.potential
+
+        row, col = self.random_cell()
+        c1_state = self.grid[row][col]
+        c1_neighbors = count_neighbors_at(self.grid, row, col)
+
+        e0 = - (c1_state * c1_neighbors) - (potential * self.mol_num)
+        
+        new_mol_num = self.mol_num
+        new_state = 1 - c1_state # The proposed new state (0->1 or 1->0)
+
+        if new_state == 1:
+            new_mol_num += 1
+        else:
+            new_mol_num -= 1
+        
+        e1 = - (new_state * c1_neighbors) - (potential * new_mol_num)
+
+        # Use Metropolis acceptance criteria
+        delta_e = e1 - e0
+        if delta_e < 0:
+            # If energy is lower, always accept the change
+            self.grid[row][col] = new_state
+            self.mol_num = new_mol_num
+            self.bonds += (new_state - c1_state) * c1_neighbors
+            if self.clusters is not None:
+                self._track_clusters(row, col)
+        else:
+            # If energy is higher, accept with a probability
+            prob = math.exp(-delta_e / temperature)
+            if self.rng.uniform() <= prob:
+                self.grid[row][col] = new_state
+                self.mol_num = new_mol_num
+                self.bonds += (new_state - c1_state) * c1_neighbors
+                if self.clusters is not None:
+                    self._track_clusters(row, col)
+
+    """
+    Flips one cell with the n-fold way engine unless its clock would pass until first; every flip
+    is an accepted move. Returns whether a cell flipped.
+    """
+    def nfold_dynamics(self, until=math.inf):
+        self.nfold.set_parameters(self.temperature, self.potential)
+        flipped = self.nfold.step(until)
+        if flipped is None:
+            return False
+        row, col, bond_change = flipped
+        self.mol_num += 1 if self.grid[row][col] == 1 else -1
+        self.bonds += bond_change
+        if self.clusters is not None:
+            self._track_clusters(row, col)
+        return True
+
+    """
+    Advances the dynamics by one sweep of physical time and records the observables: GRID_WIDTH *
+    GRID_HEIGHT Metropolis proposals, or n-fold flips until the clock reaches the next sweep, so
+    sweep, the series and the trajectory count the same time with either dynamics.
+    """
+    def run_sweep(self):
+        if self.instruments.enabled:
+            self._counted_sweep()
+        elif self.nfold is not None:
+            while self.nfold_dynamics(self.sweep + 1):
+                pass
+        else:
+            for _ in range(GRID_WIDTH * GRID_HEIGHT):
+                self.glauber_dynamics()
+        self.sweep += 1
+        self.series.append(self.sweep, self.mol_num, self.bonds, self.energy())
+
+    """
+    run_sweep's loop with counting: every accepted flip changes mol_num, so its sign gives the move.
+    An n-fold sweep is all accepted flips and stands for the sweep of proposals its clock covered.
+    """
+    def _counted_sweep(self):
+        if self.nfold is not None:
+            steps = iter(functools.partial(self.nfold_dynamics, self.sweep + 1), False)
+        else:
+            steps = (self.glauber_dynamics() for _ in range(GRID_WIDTH * GRID_HEIGHT))
+        adds = removes = 0
+        before = self.mol_num
+        for _ in steps:
+            if self.mol_num > before:
+                adds += 1
+            elif self.mol_num < before:
+                removes += 1
+            before = self.mol_num
+
+        instruments = self.instruments
+        instruments.proposals += GRID_WIDTH * GRID_HEIGHT
+        instruments.accepts["add"] += adds
+        instruments.accepts["remove"] += removes
+        instruments.sweeps += 1
+
 class GridSimulation:
     def __init__(self, root):
         self.root = root
         self.root.title("Glauber Dynamics")
 
-        # --- Grid Data Structure ---
-        # Start with an empty grid
-        self.grid = [[0 for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
-        self.mol_num = 0
+        # --- Simulation Core ---
+        # The dynamics run in a worker thread; this class only draws and forwards input
+        self.instruments = Instruments(MOVES, PHASES, INSTRUMENT, STATS_EXPORT)
+        self.sim = LatticeSimulation(instruments=self.instruments)
+        recording = TrajectoryWriter(RECORD, GRID_HEIGHT, GRID_WIDTH) if RECORD is not None and REPLAY is None else None
+        self.worker = SimulationWorker(self.sim, recording, RECORD_INTERVAL)
+
+        # --- Replay ---
+        # With a trajectory to replay the worker is never started and the frame slider drives the canvas
+        self.trajectory = None
+        if REPLAY is not None:
+            self.trajectory = Trajectory(REPLAY)
+            if (self.trajectory.height, self.trajectory.width) != (GRID_HEIGHT, GRID_WIDTH):
+                raise ValueError(f"{REPLAY} is a {self.trajectory.height}x{self.trajectory.width} trajectory, "
+                                 f"the grid is {GRID_HEIGHT}x{GRID_WIDTH}")
 
         # --- Tkinter Canvas Setup ---
         self.canvas = tk.Canvas(root, width=SCREEN_WIDTH, height=SCREEN_HEIGHT, bg=WHITE)
         self.canvas.pack()
 
-        # A 2D list to hold the ID of each rectangle on the canvas
-        self.rectangles = [[None for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
-
-        self.create_grid_rectangles()
+        self.renderer = LatticeRenderer(self.canvas, GRID_HEIGHT, GRID_WIDTH, CELL_SIZE, (WHITE, CELL_COLOR), GRID_LINE_COLOR,
+                                        RENDER_MODE)
+        self.drawn_version = None
         self.draw_grid()
 
+        # --- Instrumentation HUD ---
+        # Created after the lattice images so it stays on top of them
+        if self.instruments.enabled:
+            self.hud_id = self.canvas.create_text(4, 4, anchor=tk.NW, fill=BLACK, font=("TkFixedFont", 8))
+            self.last_report = time.perf_counter()
+
+        # --- Cluster Readout ---
+        if CLUSTERS:
+            self.cluster_id = self.canvas.create_text(4, SCREEN_HEIGHT - 4, anchor=tk.SW, fill=BLACK,
+                                                      font=("TkFixedFont", 8))
+
          # --- Controls Frame ---
         # A frame to hold all the sliders and controls neatly
         controls_frame = tk.Frame(root)
@@ -106,11 +390,19 @@ class GridSimulation:
         # --- 2D SLIDER SETUP ---
         self.setup_2d_slider(controls_frame)
 
+        # --- Saved Lattice ---
+        if self.trajectory is None:
+            self.setup_lattice_buttons(controls_frame)
+
         # Bind mouse click event to a handler function
         self.canvas.bind("<Button-1>", self.handle_mouse_click)
 
         # --- Simulation Loop ---
         self.running = True
+        if self.trajectory is None:
+            self.worker.start()
+        else:
+            self.setup_replay(controls_frame)
         self.update_simulation() # Start the loop
 
 
@@ -142,7 +434,12 @@ class GridSimulation:
         )
         self.slider_2d_canvas.pack()
 
-        bg_image_pil = Image.open("sampled-phase-diagram.png").resize((self.slider_2d_width+10, self.slider_2d_height+10))
+        records = load_store(height=GRID_HEIGHT, width=GRID_WIDTH)
+        raster = store_raster(records) if records is not None else None
+        if raster is None or np.isnan(raster).any():
+            bg_image_pil = Image.open(PHASE_DIAGRAM_IMAGE).resize((self.slider_2d_width+10, self.slider_2d_height+10))
+        else:
+            bg_image_pil = phase_diagram_image(raster, self.slider_2d_width, self.slider_2d_height)
         self.slider_bg_photo = ImageTk.PhotoImage(bg_image_pil)
     
         self.slider_2d_canvas.create_image(0, 0, anchor=tk.NW, image=self.slider_bg_photo)
@@ -209,31 +506,75 @@ class GridSimulation:
         # Update the Tkinter variables
         self.temperature_2d_var.set(round(temperature, 2))
         self.potential_var.set(round(potential, 2))
+        self.worker.send("parameters", round(temperature, 2), round(potential, 2))
 
         # Update the display variables
         self.temperature_display_var.set(f"{temperature:.2f}")
         self.potential_display_var.set(f"{potential:.2f}")
 
-    """Creates the rectangle objects on the canvas once at the start."""
-    def create_grid_rectangles(self):
-        for row in range(GRID_HEIGHT):
-            for col in range(GRID_WIDTH):
-                x1 = col * CELL_SIZE
-                y1 = row * CELL_SIZE
-                x2 = x1 + CELL_SIZE
-                y2 = y1 + CELL_SIZE
-                self.rectangles[row][col] = self.canvas.create_rectangle(
-                    x1, y1, x2, y2, fill=WHITE, outline=GRID_LINE_COLOR
-                )
-
-    """Updates the color of the rectangles on the canvas based on the grid data."""
+    """Moves the knob to a temperature and potential and applies them, as if it had been dragged there."""
+    def set_knob(self, temperature, potential):
+        x, y = self._coords_to_pixels(temperature, potential)
+        self.slider_2d_canvas.coords(self.knob_id,
+            x - self.knob_radius, y - self.knob_radius,
+            x + self.knob_radius, y + self.knob_radius)
+        self.temperature_2d_var.set(round(temperature, 2))
+        self.potential_var.set(round(potential, 2))
+        self.worker.send("parameters", round(temperature, 2), round(potential, 2))
+        self.temperature_display_var.set(f"{temperature:.2f}")
+        self.potential_display_var.set(f"{potential:.2f}")
+
+    """Creates the buttons that save the lattice to LATTICE_FILE and load it back."""
+    def setup_lattice_buttons(self, parent_frame):
+        buttons_frame = tk.Frame(parent_frame)
+        buttons_frame.pack(side=tk.BOTTOM)
+        tk.Button(buttons_frame, text="Save lattice", command=self.save_lattice).pack(side=tk.LEFT)
+        tk.Button(buttons_frame, text="Load lattice", command=self.load_lattice).pack(side=tk.LEFT)
+
+    """Has the worker save its lattice to LATTICE_FILE between two sweeps."""
+    def save_lattice(self):
+        self.worker.send("save", LATTICE_FILE)
+
+    """Hands the lattice in LATTICE_FILE to the worker and moves the knob to where it was saved."""
+    def load_lattice(self):
+        if not os.path.exists(LATTICE_FILE):
+            return
+        cells, fields = load_lattice(LATTICE_FILE, GRID_HEIGHT, GRID_WIDTH)
+        self.worker.send("load", cells, fields["sweep"])
+        self.set_knob(fields["temperature"], fields["potential"])
+
+    """Creates the frame slider of replay mode and shows the first frame."""
+    def setup_replay(self, parent_frame):
+        self.frame_var = tk.IntVar(value=0)
+        self.frame_sweep_var = tk.StringVar()
+        tk.Scale(
+            parent_frame,
+            variable=self.frame_var,
+            from_=0,
+            to=max(len(self.trajectory) - 1, 0),
+            orient=tk.HORIZONTAL,
+            label="Frame",
+            command=self._on_frame_change
+        ).pack(side=tk.BOTTOM, fill=tk.X, padx=5, pady=5)
+        tk.Label(parent_frame, textvariable=self.frame_sweep_var).pack(side=tk.BOTTOM)
+        if len(self.trajectory):
+            self._on_frame_change(0)
+
+    """Shows one frame of the replayed trajectory."""
+    def _on_frame_change(self, value):
+        index = int(value)
+        frame = self.trajectory.frame(index)
+        self.renderer.draw(frame)
+        self.frame_sweep_var.set(f"Sweep {self.trajectory.sweeps[index]}")
+        if CLUSTERS:
+            self.canvas.itemconfigure(self.cluster_id, text=cluster_text(cluster_stats(frame).summary()))
+
+    """Redraws the lattice image from the latest snapshot, if the worker has published a new one."""
     def draw_grid(self):
-        for row in range(GRID_HEIGHT):
-            for col in range(GRID_WIDTH):
-                cell_state = self.grid[row][col]
-                rect_id = self.rectangles[row][col]
-                color = CELL_COLOR if cell_state == 1 else WHITE
-                self.canvas.itemconfig(rect_id, fill=color)
+        snapshot, version = self.worker.snapshot()
+        if version != self.drawn_version:
+            self.renderer.draw(snapshot)
+            self.drawn_version = version
 
     """Toggles the state of a cell when clicked."""
     def handle_mouse_click(self, event):
@@ -241,71 +582,37 @@ class GridSimulation:
         row = event.y // CELL_SIZE
         
         if 0 <= row < GRID_HEIGHT and 0 <= col < GRID_WIDTH:
-            if self.grid[row][col] == 0:
-                self.mol_num += 1
-            else:
-                self.mol_num -= 1
-            self.grid[row][col] = 1 - self.grid[row][col]
-
-    """Return a random 0-indexed cell (x,y) on the grid"""
-    def random_cell(self):
-        return Coordinate(random.randint(0,GRID_WIDTH-1), random.randint(0,GRID_HEIGHT-1))
-
-    def glauber_dynamics(self):
-        temperature = float(self.temperature_2d_var.get())
-        if temperature <= 0: return
-
-        potential = float(self.potential_var.get())
-
-        c1 = self.random_cell()  
-        c1_state = self.grid[c1.y][c1.x]
-        c1_neighbors = nonselective_count_neighbors(c1, self.grid)
+            self.worker.send("toggle", row, col)
 
-        e0 = - (c1_state * c1_neighbors) - (potential * self.mol_num)
-        
-        new_mol_num = self.mol_num
-        new_state = 1 - c1_state # The proposed new state (0->1 or 1->0)
-
-        if new_state == 1:
-            new_mol_num += 1
-        else:
-            new_mol_num -= 1
-        
-        e1 = - (new_state * c1_neighbors) - (potential * new_mol_num)
-
-        # Use Metropolis acceptance criteria
-        delta_e = e1 - e0
-        if delta_e < 0:
-            # If energy is lower, always accept the change
-            self.grid[c1.y][c1.x] = new_state
-            self.mol_num = new_mol_num
-        else:
-            # If energy is higher, accept with a probability
-            prob = math.exp(-delta_e / temperature)
-            if random.random() <= prob:
-                self.grid[c1.y][c1.x] = new_state
-                self.mol_num = new_mol_num
-
-    """This is the main loop for the simulation."""
+    """This is the main loop of the GUI; the simulation itself runs in self.worker."""
     def update_simulation(self):
         if not self.running:
+            self.worker.stop()
             return
 
-        # Run multiple steps per frame to speed up the simulation
-        steps_per_frame = GRID_WIDTH * GRID_HEIGHT
-        for _ in range(steps_per_frame):
-            self.glauber_dynamics()
-        
         # --- Drawing ---
-        self.draw_grid()
+        with self.instruments.timer("draw"):
+            self.draw_grid()
+        if CLUSTERS and self.trajectory is None:
+            self.canvas.itemconfigure(self.cluster_id, text=cluster_text(self.worker.cluster_summary))
+
+        # --- Instrumentation ---
+        if self.instruments.enabled and time.perf_counter() - self.last_report >= STATS_INTERVAL:
+            self.canvas.itemconfigure(self.hud_id, text=self.instruments.hud(self.instruments.report()))
+            self.last_report = time.perf_counter()
         
         # --- Schedule the next update ---
-        self.root.after(1, self.update_simulation)
+        self.root.after(int(1000 / TARGET_FPS), self.update_simulation)
 
 def main():
     root = tk.Tk()
     app = GridSimulation(root)
     root.mainloop()
+    # let the worker finish its batch and close the trajectory it is recording
+    app.worker.stop()
+    if app.worker.is_alive():
+        app.worker.join()
+    app.instruments.close()
 
 if __name__ == "__main__":
     main()
@@ -2,8 +2,9 @@
 import matplotlib.pyplot as plt
 import math
 import numpy as np
+from phase_store import STORE_DIR, STORE_ENGINE, STORE_HEIGHT, STORE_WIDTH, load_store, store_raster
 
-# data from glauber-phase-sampler.py
+# data from glauber-phase-sampler.py, shown when its result store is empty
 DATA = [
 [0, 255, 254, 253, 247, 226, 221, 193, 190, 191],
 [0, 255, 255, 248, 243, 225, 201, 192, 183, 179],
@@ -19,7 +20,7 @@ DATA = [
 
 
 # --- Constants ---
-GRID_SIZE = 10       
+GRID_SIZE = 10 # ticks per side of the diagram, the sampler's DIAGRAM_RESOLUTION
 
 def display_colormap(data):
 
@@ -36,8 +37,16 @@ def display_colormap(data):
     plt.show()
 
 def main():
+    records = load_store()
+    data = store_raster(records, GRID_SIZE) * 255 if records is not None else None
+    if data is None or np.isnan(data).all():
+        print(f"No {STORE_ENGINE} results on a {STORE_HEIGHT}x{STORE_WIDTH} lattice in {STORE_DIR}/, showing the built-in data")
+        data = DATA
+    else:
+        missing = np.count_nonzero(np.isnan(data))
+        print(f"Loaded {GRID_SIZE**2 - missing} of {GRID_SIZE**2} diagram points from {STORE_DIR}/")
     print("Displaying colormap with Matplotlib...")
-    display_colormap(DATA)
+    display_colormap(data)
     print("Done.")
 
 if __name__ == "__main__":
@@ -1,18 +1,119 @@
+import argparse
 import numpy as np
-import random
 import math
+import time
+import contextlib
+import multiprocessing
+import os
+import json
+import hashlib
+import tempfile
+from multiprocessing import shared_memory
+from instruments import Instruments
+from random_stream import RandomStream
+from lattice import count_neighbors_at, neighbor_sum, bond_count
+from pool import run_tasks
+from nfold import NFoldWay
+from clusters import CLUSTER_FIELDS, union_find_labels, cluster_stats, ClusterTracker
+from phase_store import (STORE_DIR, MODEL, ADAPTIVE_PREFIX, TEMP_MAX, TEMP_MIN, POTENTIAL_MAX, POTENTIAL_MIN,
+                         ResultStore)
 
 GRID_WIDTH = 40     
 GRID_HEIGHT = 20    
 TEMP_INIT = 0.01
-TEMP_MAX = 2.0
-TEMP_MIN = 0.01
 POTENTIAL_INIT = -3.0
-POTENTIAL_MAX = -1.0
-POTENTIAL_MIN = -3.0
-ITER_PER_SAMPLE = GRID_WIDTH * GRID_HEIGHT * 800 # arbitrarily chosen to be big enough to appraoch steady-state
+SWEEPS_PER_SAMPLE = 800 # arbitrarily chosen to be big enough to appraoch steady-state
+ITER_PER_SAMPLE = GRID_WIDTH * GRID_HEIGHT * SWEEPS_PER_SAMPLE
 DIAGRAM_RESOLUTION = 10 # no. of ticks in the phase diagram
 
+# --- Engines ---
+# "reference": one pure-Python glauber_dynamics() call per proposal
+# "checkerboard": vectorized NumPy sweeps, one sublattice colour at a time
+# "ensemble": checkerboard sweeps over many replicas held in one (R, H, W) array;
+#             sweep_diagram runs a whole diagram row as one ensemble
+# "nfold": rejection-free n-fold way for SWEEPS_PER_SAMPLE sweeps of physical time; fastest at low T
+# "packed": checkerboard sweeps on a PackedLattice, 64 cells per bitwise operation; for huge grids
+# "cluster": Swendsen-Wang cluster updates of the equivalent Ising model; beats critical slowing down
+# "tempering": an ensemble over the temperatures of a diagram row with replica exchange between them;
+#              a row engine, so sweep_diagram only, not sample_simulate
+# "decomposed": checkerboard sweeps of one lattice split into strips, one worker process each
+#               (decomposed_simulate); sweep_diagram then runs its points one after another
+ENGINES = ("reference", "checkerboard", "ensemble", "nfold", "packed", "cluster", "tempering", "decomposed")
+ENGINE = "checkerboard"
+PACKED_PRECISION = 32 # bits of the random numbers compared with acceptance probabilities
+
+# --- Parallel Sweep ---
+SEED = 2024 # root seed; every diagram point gets its own stream spawned from it
+WORKERS = None # size of the process pool, None for one worker per core
+
+# --- Domain Decomposition ---
+# decomposed_simulate splits one big lattice into strips, one worker process each; every row draws
+# from its own stream, so the result does not depend on the number of strips. Strips meet at a
+# barrier twice a sweep, so this only pays off for lattices far bigger than GRID_HEIGHT x GRID_WIDTH
+BOUNDARIES = ("open", "periodic") # "open" matches nonselective_count_neighbors
+BOUNDARY = "open"
+STRIP_BARRIER_TIMEOUT = 60 # seconds a strip waits for the others before giving up
+
+# --- Replica Exchange ---
+# The replicas are the diagram's own columns, far too few for a 20x40 lattice: the energy distributions
+# of neighboring columns barely overlap, so in the middle of the diagram (T ~ 0.4-1.2 at resolution 10)
+# almost no swap is accepted and the replicas there run as a plain ensemble. Swaps are only frequent
+# between the coldest columns, whose replicas sit in the same state, and between the hottest ones
+SWAP_INTERVAL = 10 # sweeps between rounds of swap proposals in tempering_simulate
+
+# --- Histogram Reweighting ---
+HISTOGRAM_RESOLUTION = 4 # no. of ticks of the coarse diagram that is actually simulated
+HISTOGRAM_EQUILIBRATION = 200 # sweeps discarded before recording (bonds, mol_num)
+REWEIGHT_NEIGHBORS = 4 # nearest runs considered per target point, None for all; only those overlapping are combined
+REWEIGHT_MIN_OVERLAP = 0.05 # two runs overlap if each has at least this fraction of its samples on states the other saw
+REWEIGHT_MIN_SAMPLES = 20 # effective samples a reweighted average needs; with fewer it is NaN, outside the support
+REWEIGHT_TAIL = 0.05 # and its mean bonds and mol_num must lie in the central 1 - 2 * REWEIGHT_TAIL of one run's samples
+WHAM_TOLERANCE = 1e-7
+WHAM_ITERATIONS = 2000
+
+# --- Quadtree Refinement ---
+QUADTREE_RESOLUTION = 33 # no. of ticks of the finest diagram sweep_diagram_quadtree may reach
+QUADTREE_INITIAL = 4 # cells per side before any refinement
+REFINE_THRESHOLD = 24 # split a cell if its corner densities (0-255) differ by more than this
+REFINE_ERROR = 6 # or if any corner's standard error (0-255) is above this
+
+# --- Adaptive Sampling ---
+# Instead of a fixed SWEEPS_PER_SAMPLE, run until the density stops drifting and then
+# until enough statistically independent samples have been collected
+ADAPTIVE = True # main() uses sweep_diagram_adaptive instead of sweep_diagram
+EQUILIBRATION_WINDOW = 25 # sweeps per block of the drift test
+DRIFT_SIGMAS = 2.0 # consecutive blocks must agree within this many standard errors
+INDEPENDENT_SAMPLES = 50 # stop once sweeps / (2 * tau) reaches this
+MAX_SWEEPS_PER_SAMPLE = 4 * SWEEPS_PER_SAMPLE
+
+# --- Continuation ---
+# Instead of an empty grid per point, walk the diagram along a path, starting every point from the
+# lattice the previous one left behind, then walk the same path back; the two walks disagree where
+# the lattice stays in a metastable state, which shows the hysteresis around coexistence
+# "serpentine": along every row from POTENTIAL_MAX down, alternating direction, as one chain
+# "hysteresis": up every temperature column in potential and back down, one chain per column
+# On the default 10x10 diagram both paths, forward and reverse, take about a third of the time of sweep_diagram
+CONTINUATION_PATHS = ("serpentine", "hysteresis")
+CONTINUATION = None # main() uses sweep_diagram_continuation along this path instead of its usual sweep
+CONTINUATION_SWEEPS = SWEEPS_PER_SAMPLE // 8 # per point after a chain's first, which gets SWEEPS_PER_SAMPLE
+
+# --- Checkpoints ---
+# Given a checkpoint file, sweep_diagram, sweep_diagram_adaptive and sweep_diagram_continuation save
+# their progress to it every CHECKPOINT_INTERVAL seconds and when they finish, and pick it up again
+# if it exists: finished points are not rerun and continuation chains go on from their saved lattice
+# and generator state, so a resumed sweep gives exactly the results of an uninterrupted one.
+# main() checkpoints to CHECKPOINT and starts over unless run with --resume
+CHECKPOINT = "sweep-checkpoint.npz"
+CHECKPOINT_INTERVAL = 60 # seconds between saves
+
+# --- Instrumentation ---
+# Off by default. When on, main() counts proposals and accepted moves of every single-point engine
+# and times each sample, then prints the totals (not for "ensemble", "tempering" and "decomposed")
+INSTRUMENT = False
+STATS_EXPORT = None # file to append the report to: CSV if it ends in ".csv", otherwise JSON lines
+MOVES = ("add", "remove") # accepted moves are counted by type
+PHASES = ("sample",)
+
 class Coordinate:
     def __init__(self, x_coord, y_coord):
         self.x = x_coord
@@ -36,15 +137,16 @@ def nonselective_count_neighbors(coord, g):
             count += 1
         return count
 
-def random_cell():
-    return Coordinate(random.randint(0,GRID_WIDTH-1), random.randint(0,GRID_HEIGHT-1))
+def random_cell(rng):
+    """(row, col) of a random cell, from a RandomStream"""
+    return divmod(rng.site(), GRID_WIDTH)
 
-def glauber_dynamics(temperature, potential, grid, mol_num):
+def glauber_dynamics(temperature, potential, grid, mol_num, rng):
     if temperature <= 0: return
 
-    c1 = random_cell()  
-    c1_state = grid[c1.y][c1.x]
-    c1_neighbors = nonselective_count_neighbors(c1, grid)
+    row, col = random_cell(rng)
+    c1_state = grid[row][col]
+    c1_neighbors = count_neighbors_at(grid, row, col)
 
     e0 = - (c1_state * c1_neighbors) - (potential * mol_num)
     
@@ -62,39 +164,1321 @@ def glauber_dynamics(temperature, potential, grid, mol_num):
     delta_e = e1 - e0
     if delta_e < 0:
         # If energy is lower, always accept the change
-        grid[c1.y][c1.x] = new_state
+        grid[row][col] = new_state
         mol_num = new_mol_num
     else:
         # If energy is higher, accept with a probability
         prob = math.exp(-delta_e / temperature)
-        if random.random() <= prob:
-            grid[c1.y][c1.x] = new_state
+        if rng.uniform() <= prob:
+            grid[row][col] = new_state
             mol_num = new_mol_num
     
     return grid, mol_num
 
-def sample_simulate(temp, poten):
-    grid = [[0 for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
+def checkerboard_masks(height, width):
+    """Boolean masks of the two sublattices; no two cells of one colour are neighbors"""
+    rows, cols = np.indices((height, width))
+    red = (rows + cols) % 2 == 0
+    return red, ~red
+
+def acceptance_table(temperature, potential):
+    """
+    Metropolis acceptance probability of flipping a cell, indexed by [state, occupied neighbors].
+    Uses the same energy as glauber_dynamics: delta_e = -(new_state - state) * (neighbors + potential)
+    """
+    if temperature <= 0:
+        return np.zeros((2, 5))
+    neighbors = np.arange(5)
+    delta_e = np.array([-(neighbors + potential), neighbors + potential])
+    return np.exp(-np.maximum(delta_e, 0) / temperature)
+
+def checkerboard_sweep(grid, table, masks, rng):
+    """
+    One Glauber sweep: every cell of one colour is proposed and accepted/rejected in a single
+    vectorized Metropolis step, then the same for the other colour.
+    Returns the change in mol_num and in the no. of neighboring molecule pairs (bonds).
+    """
+    mol_change = 0
+    bond_change = 0
+    for mask in masks:
+        neighbors = neighbor_sum(grid)
+        prob = table[grid, neighbors]
+        flip = mask & (rng.random(grid.shape) <= prob)
+        change = 1 - 2 * grid[flip].astype(int) # +1 for 0->1, -1 for 1->0
+        mol_change += int(change.sum())
+        bond_change += int((change * neighbors[flip]).sum())
+        grid ^= flip
+    return mol_change, bond_change
+
+def ensemble_sweep(grids, tables, masks, rng):
+    """
+    One checkerboard sweep of every replica in lockstep. grids is (R, H, W) and tables is (R, 2, 5),
+    one acceptance_table per replica, so each replica keeps its own temperature and potential.
+    """
+    replicas = np.arange(grids.shape[0])[:, None, None]
+    for mask in masks:
+        prob = tables[replicas, grids, neighbor_sum(grids)]
+        flip = mask & (rng.random(grids.shape) <= prob)
+        grids ^= flip
+
+def ensemble_simulate(temps, potens, seed=None, sweeps=SWEEPS_PER_SAMPLE):
+    """
+    Simulate one lattice per (temperature, potential) pair as a single (R, H, W) array and return
+    their densities (0-255). Scalars broadcast, so ensemble_simulate(np.full(16, t), p) gives
+    16 independent seeds of the same point for error bars.
+    """
+    temps, potens = np.broadcast_arrays(np.atleast_1d(np.asarray(temps, dtype=float)),
+                                        np.atleast_1d(np.asarray(potens, dtype=float)))
+    grids = np.zeros((len(temps), GRID_HEIGHT, GRID_WIDTH), dtype=np.int8)
+
+    rng = np.random.default_rng(seed)
+    tables = np.array([acceptance_table(t, p) for t, p in zip(temps, potens)])
+    masks = checkerboard_masks(GRID_HEIGHT, GRID_WIDTH)
+    for _ in range(sweeps):
+        ensemble_sweep(grids, tables, masks, rng)
+
+    return np.rint(grids.mean(axis=(1, 2)) * 255).astype(int)
+
+ONES = ~np.uint64(0)
+
+def _shift_left(words, bits):
+    return words << np.uint64(bits)
+
+def _shift_right(words, bits):
+    return words >> np.uint64(bits)
+
+def popcount(words):
+    """Total no. of set bits in an array of uint64 words"""
+    return int(np.unpackbits(np.ascontiguousarray(words).view(np.uint8)).sum())
+
+class PackedLattice:
+    """
+    Multispin-coded lattice: occupancies packed 64 to a uint64 word, bit j of words[row, k] being
+    cell (row, 64 * k + j), so an 8192 x 8192 lattice takes 8 MB. Bits past the last column stay 0.
+    """
+    def __init__(self, height, width):
+        self.height = height
+        self.width = width
+        self.words = np.zeros((height, -(-width // 64)), dtype=np.uint64)
+
+        # Bits of real columns, and the two checkerboard colours within them
+        valid = np.array([ONES if width - 64 * k >= 64 else (np.uint64(1) << np.uint64(width - 64 * k)) - np.uint64(1)
+                          for k in range(self.words.shape[1])], dtype=np.uint64)
+        even = np.uint64(0x5555555555555555) & valid # columns 0, 2, 4, ... of every word
+        odd = np.uint64(0xAAAAAAAAAAAAAAAA) & valid
+        red = np.where((np.arange(height) % 2 == 0)[:, None], even, odd)
+        black = np.where((np.arange(height) % 2 == 0)[:, None], odd, even)
+        self.colours = (red, black)
+
+    @classmethod
+    def from_grid(cls, grid):
+        """Packs a list-of-lists (or array) grid of 0/1"""
+        cells = np.asarray(grid, dtype=np.uint8)
+        lattice = cls(*cells.shape)
+        padded = np.zeros((lattice.height, lattice.words.shape[1] * 64), dtype=np.uint8)
+        padded[:, :lattice.width] = cells
+        lattice.words[...] = np.packbits(padded, axis=1, bitorder="little").view("<u8")
+        return lattice
+
+    def to_array(self):
+        cells = np.unpackbits(self.words.astype("<u8").view(np.uint8), axis=1, bitorder="little")
+        return cells[:, :self.width]
+
+    def to_grid(self):
+        """Unpacks to the list-of-lists grid the rest of the code uses"""
+        return self.to_array().tolist()
+
+    def count(self):
+        return popcount(self.words)
+
+    def neighbor_count_planes(self):
+        """
+        No. of occupied neighbors of every cell as three bit planes (1s, 2s and 4s), added up
+        64 cells at a time. Edges are open, like nonselective_count_neighbors.
+        """
+        w = self.words
+        up = np.zeros_like(w)
+        up[1:] = w[:-1]
+        down = np.zeros_like(w)
+        down[:-1] = w[1:]
+        left = _shift_left(w, 1) # bit j gets column j - 1
+        left[:, 1:] |= _shift_right(w[:, :-1], 63)
+        right = _shift_right(w, 1) # bit j gets column j + 1
+        right[:, :-1] |= _shift_left(w[:, 1:], 63)
+
+        # Two half adders, then a full adder on the carries
+        s = up ^ down
+        t = left ^ right
+        ones = s ^ t
+        c1, c2, c3 = up & down, left & right, s & t
+        twos = c1 ^ c2 ^ c3
+        fours = (c1 & c2) | (c1 & c3) | (c2 & c3)
+        return ones, twos, fours
+
+def packed_sweep(lattice, table, rng):
+    """
+    One checkerboard Glauber sweep of a PackedLattice with bitwise operations only.
+    For every cell, a PACKED_PRECISION-bit random number is compared bit plane by bit plane
+    with the acceptance probability of its (state, neighbors) class from acceptance_table.
+    """
+    for colour in lattice.colours:
+        ones, twos, fours = lattice.neighbor_count_planes()
+        occupied = lattice.words
+
+        always = np.zeros_like(occupied)
+        classes = [] # (cells of the class, probability as a PACKED_PRECISION-bit integer)
+        for state in (0, 1):
+            cells = occupied if state else ~occupied
+            for neighbors in range(5):
+                prob = table[state, neighbors]
+                if prob <= 0:
+                    continue
+                mask = cells & (ones if neighbors & 1 else ~ones) & (twos if neighbors & 2 else ~twos) & \
+                    (fours if neighbors & 4 else ~fours) & colour
+                if prob >= 1:
+                    always |= mask
+                else:
+                    classes.append((mask, int(prob * 2**PACKED_PRECISION)))
+
+        # uniform < prob, from the most significant bit down; stop once every comparison is decided
+        less = np.zeros_like(occupied)
+        equal = np.zeros_like(occupied)
+        for mask, _ in classes:
+            equal |= mask
+        for bit in range(PACKED_PRECISION - 1, -1, -1):
+            if not equal.any():
+                break
+            uniform = rng.bit_generator.random_raw(occupied.shape)
+            threshold = np.zeros_like(occupied)
+            for mask, prob in classes:
+                if (prob >> bit) & 1:
+                    threshold |= mask
+            less |= equal & ~uniform & threshold
+            equal &= ~(uniform ^ threshold)
+
+        lattice.words ^= always | less
+
+def strip_neighbor_sum(block, periodic):
+    """
+    Neighbor counts of the inner rows of a strip that carries one ghost row above and one below.
+    With periodic boundaries the columns wrap around too.
+    """
+    neighbors = neighbor_sum(block)[1:-1]
+    if periodic:
+        inner = block[1:-1]
+        neighbors[:, 0] += inner[:, -1]
+        neighbors[:, -1] += inner[:, 0]
+    return neighbors
+
+def _strip_worker(shm_name, shape, first_row, last_row, temp, poten, sweeps, periodic, seeds, barrier):
+    """
+    Sweeps rows [first_row, last_row) of the shared lattice, each row drawing from its own SeedSequence
+    of seeds. Before each half-sweep the ghost rows are read from the neighboring strips (or wrapped,
+    or left empty for open edges); afterwards all strips meet at the barrier, so no strip starts a
+    colour before every strip finished the last one.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        lattice = np.ndarray(shape, dtype=np.int8, buffer=shm.buf)
+        height, width = shape
+        rngs = [np.random.default_rng(seed) for seed in seeds]
+        table = acceptance_table(temp, poten)
+        rows, cols = np.indices((last_row - first_row, width))
+        colours = ((rows + cols + first_row) % 2 == 0, (rows + cols + first_row) % 2 == 1)
+
+        block = np.zeros((last_row - first_row + 2, width), dtype=np.int8)
+        for _ in range(sweeps):
+            for colour in colours:
+                # --- Halo Exchange ---
+                block[1:-1] = lattice[first_row:last_row]
+                block[0] = lattice[(first_row - 1) % height] if periodic or first_row > 0 else 0
+                block[-1] = lattice[last_row % height] if periodic or last_row < height else 0
+
+                inner = block[1:-1]
+                prob = table[inner, strip_neighbor_sum(block, periodic)]
+                uniform = np.stack([rng.random(width) for rng in rngs])
+                flip = colour & (uniform <= prob)
+                lattice[first_row:last_row] = inner ^ flip
+                barrier.wait(STRIP_BARRIER_TIMEOUT)
+        del lattice
+    finally:
+        shm.close()
+
+def decomposed_simulate(temp, poten, height, width, sweeps=SWEEPS_PER_SAMPLE, workers=WORKERS,
+                        boundary=BOUNDARY, seed=None, grid=None):
+    """
+    Checkerboard-sweep a single height x width lattice split into horizontal strips, one worker
+    process per strip, all sharing the lattice through shared memory. Starts from grid (or empty)
+    and returns the final lattice as an int8 array, the same for any number of workers.
+    """
+    if boundary not in BOUNDARIES:
+        raise ValueError(f"unknown boundary {boundary!r}, expected one of {BOUNDARIES}")
+    periodic = boundary == "periodic"
+    if periodic and (height % 2 or width % 2):
+        raise ValueError("periodic checkerboard sweeps need an even width and height")
+
+    workers = min(workers or os.cpu_count(), height)
+    bounds = np.linspace(0, height, workers + 1).astype(int)
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    seeds = seed.spawn(height) # one per row
+
+    shm = shared_memory.SharedMemory(create=True, size=height * width)
+    try:
+        lattice = np.ndarray((height, width), dtype=np.int8, buffer=shm.buf)
+        lattice[...] = 0 if grid is None else np.asarray(grid, dtype=np.int8)
+        barrier = multiprocessing.Barrier(workers)
+        processes = [
+            multiprocessing.Process(target=_strip_worker, args=(shm.name, (height, width), bounds[i], bounds[i + 1],
+                                                                temp, poten, sweeps, periodic, seeds[bounds[i]:bounds[i + 1]], barrier))
+            for i in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        if any(process.exitcode != 0 for process in processes):
+            raise RuntimeError("a strip worker failed; the lattice is incomplete")
+        result = lattice.copy()
+        del lattice
+        return result
+    finally:
+        shm.close()
+        shm.unlink()
+
+def ising_couplings(potential, height, width):
+    """
+    Ising coupling J and per-site field h equivalent to the lattice gas. With n = (1 + s) / 2,
+    -sum(n_i n_j) - potential * sum(n_i) = -J sum(s_i s_j) - sum(h_i s_i) + const, where J = 1/4
+    and h_i = z_i / 4 + potential / 2 for a site with z_i neighbors (fewer on the open edges).
+    """
+    sites = neighbor_sum(np.ones((height, width), dtype=np.int8))
+    return 0.25, sites / 4 + potential / 2
+
+def cluster_sweep(grid, temperature, coupling, field, rng):
+    """
+    One Swendsen-Wang update of the lattice gas through its Ising form (see ising_couplings).
+    Aligned neighbors bond with probability 1 - exp(-2J/T); the field is a ghost spin fixed at +1
+    that each site bonds to with probability 1 - exp(-2|h_i|/T) when s_i agrees with the sign of h_i.
+    Every cluster then flips with probability 1/2, except the one holding the ghost spin.
+    """
+    if temperature <= 0:
+        return
+    height, width = grid.shape
+    cells = height * width
+    spins = 2 * grid.astype(np.int8) - 1
+    index = np.arange(cells).reshape(height, width)
+
+    p_bond = 1 - math.exp(-2 * coupling / temperature)
+    right = (spins[:, :-1] == spins[:, 1:]) & (rng.random((height, width - 1)) < p_bond)
+    down = (spins[:-1, :] == spins[1:, :]) & (rng.random((height - 1, width)) < p_bond)
+    ghost = (spins == np.sign(field)) & (rng.random((height, width)) < 1 - np.exp(-2 * np.abs(field) / temperature))
+
+    a = np.concatenate((index[:, :-1][right], index[:-1, :][down], index[ghost]))
+    b = np.concatenate((index[:, 1:][right], index[1:, :][down], np.full(np.count_nonzero(ghost), cells)))
+    labels = union_find_labels(cells + 1, a, b)
+
+    flip = rng.random(cells + 1) < 0.5
+    flip[labels[cells]] = False
+    grid ^= flip[labels[:cells]].reshape(height, width).astype(np.int8)
+
+def tempering_simulate(temps, poten, seed=None, sweeps=SWEEPS_PER_SAMPLE, swap_interval=SWAP_INTERVAL):
+    """
+    Parallel tempering along a diagram row: one lattice per temperature, all at potential poten,
+    advanced together with ensemble_sweep. Every swap_interval sweeps, configurations at neighboring
+    temperatures i, i+1 are swapped with probability min(1, exp((1/T_i - 1/T_i+1) (E_i - E_i+1))),
+    E = -bonds - poten * mol_num, alternating between even and odd pairs. This lets cold replicas
+    stuck in a metastable branch escape through the hot ones, but only if neighboring temperatures
+    are close enough for their energy distributions to overlap (see SWAP_INTERVAL).
+    Returns the densities (0-255) and the swap acceptance rate of each neighboring pair.
+    """
+    temps = np.atleast_1d(np.asarray(temps, dtype=float))
+    if np.any(temps <= 0):
+        raise ValueError("replica exchange needs positive temperatures")
+    replicas = len(temps)
+    grids = np.zeros((replicas, GRID_HEIGHT, GRID_WIDTH), dtype=np.int8)
+
+    rng = np.random.default_rng(seed)
+    tables = np.array([acceptance_table(t, poten) for t in temps])
+    masks = checkerboard_masks(GRID_HEIGHT, GRID_WIDTH)
+    attempts = np.zeros(max(replicas - 1, 0), dtype=int)
+    accepts = np.zeros(max(replicas - 1, 0), dtype=int)
+    for sweep in range(1, sweeps + 1):
+        ensemble_sweep(grids, tables, masks, rng)
+        if sweep % swap_interval:
+            continue
+
+        bonds = np.count_nonzero(grids[:, 1:, :] & grids[:, :-1, :], axis=(1, 2)) + \
+            np.count_nonzero(grids[:, :, 1:] & grids[:, :, :-1], axis=(1, 2))
+        energy = -bonds - poten * grids.sum(axis=(1, 2))
+        for i in range((sweep // swap_interval) % 2, replicas - 1, 2):
+            attempts[i] += 1
+            exponent = (1 / temps[i] - 1 / temps[i + 1]) * (energy[i] - energy[i + 1])
+            if exponent >= 0 or rng.random() < math.exp(exponent):
+                accepts[i] += 1
+                grids[[i, i + 1]] = grids[[i + 1, i]]
+                energy[[i, i + 1]] = energy[[i + 1, i]]
+
+    densities = np.rint(grids.mean(axis=(1, 2)) * 255).astype(int)
+    return densities, accepts / np.maximum(attempts, 1)
+
+def _counting(sweep, grid, instruments):
+    """
+    Wraps sweep() so that it also counts, for instruments, the cells of grid() it changed as
+    accepted moves out of one proposal per cell. Every cell is proposed at most once per sweep.
+    """
+    def counted():
+        before = grid().copy()
+        result = sweep()
+        after = grid()
+        instruments.proposals += before.size
+        instruments.accepts["add"] += int(np.count_nonzero(after > before))
+        instruments.accepts["remove"] += int(np.count_nonzero(after < before))
+        instruments.sweeps += 1
+        return result
+    return counted
+
+def _recording(sweep, grid, trajectory):
+    """Wraps sweep() so that it also records grid() as a trajectory frame after every sweep"""
+    sweeps = 0
+    def recorded():
+        nonlocal sweeps
+        result = sweep()
+        sweeps += 1
+        trajectory.record(grid(), sweeps)
+        return result
+    return recorded
+
+def _tracking(sweep, grid, clusters):
+    """Wraps sweep() so that it also appends the sweep and the cluster summary of grid() to clusters after every sweep"""
+    sweeps = 0
+    def tracked():
+        nonlocal sweeps
+        result = sweep()
+        sweeps += 1
+        clusters.append((sweeps,) + cluster_stats(grid()).summary())
+        return result
+    return tracked
+
+def sample_simulate(temp, poten, engine=ENGINE, seed=None, instruments=None, trajectory=None, clusters=None):
+    """
+    Density (0-255) after SWEEPS_PER_SAMPLE sweeps from an empty grid. Given a trajectory.TrajectoryWriter,
+    every sweep is recorded as a frame (not for "ensemble" and "decomposed"). Given a list as
+    clusters, a CLUSTER_FIELDS record is appended to it after every sweep the same way; the "nfold"
+    engine keeps its clusters with a ClusterTracker, the others relabel the grid each sweep.
+    "decomposed" splits the lattice into WORKERS strips.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"unknown engine {engine!r}, expected one of {ENGINES}")
+    if engine == "tempering":
+        raise ValueError("\"tempering\" exchanges replicas across a diagram row; use sweep_diagram or tempering_simulate")
+
+    if engine == "ensemble":
+        return int(ensemble_simulate(temp, poten, seed)[0])
+
+    if engine == "decomposed":
+        return round(np.mean(decomposed_simulate(temp, poten, GRID_HEIGHT, GRID_WIDTH, seed=seed)) * 255)
+
+    if engine == "cluster":
+        grid = np.zeros((GRID_HEIGHT, GRID_WIDTH), dtype=np.int8)
+        rng = np.random.default_rng(seed)
+        coupling, field = ising_couplings(poten, GRID_HEIGHT, GRID_WIDTH)
+        sweep = lambda: cluster_sweep(grid, temp, coupling, field, rng)
+        if instruments is not None:
+            sweep = _counting(sweep, lambda: grid, instruments)
+        if trajectory is not None:
+            sweep = _recording(sweep, lambda: grid, trajectory)
+        if clusters is not None:
+            sweep = _tracking(sweep, lambda: grid, clusters)
+        for _ in range(SWEEPS_PER_SAMPLE):
+            sweep()
+        return round(np.mean(grid) * 255)
+
+    if engine == "packed":
+        lattice = PackedLattice(GRID_HEIGHT, GRID_WIDTH)
+        rng = np.random.default_rng(seed)
+        table = acceptance_table(temp, poten)
+        sweep = lambda: packed_sweep(lattice, table, rng)
+        if instruments is not None:
+            sweep = _counting(sweep, lattice.to_array, instruments)
+        if trajectory is not None:
+            sweep = _recording(sweep, lattice.to_array, trajectory)
+        if clusters is not None:
+            sweep = _tracking(sweep, lattice.to_array, clusters)
+        for _ in range(SWEEPS_PER_SAMPLE):
+            sweep()
+        return round(lattice.count() / (GRID_WIDTH * GRID_HEIGHT) * 255)
+
+    if engine == "nfold":
+        grid = [[0 for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
+        nfold = NFoldWay(grid, temp, poten, RandomStream(GRID_WIDTH * GRID_HEIGHT, seed))
+        tracker = ClusterTracker(grid) if clusters is not None else None
+        for sweep in range(1, SWEEPS_PER_SAMPLE + 1):
+            # flip until the clock reaches the sweep, so frames show the lattice at whole sweeps of physical time
+            while True:
+                flipped = nfold.step(sweep)
+                if flipped is None:
+                    break
+                row, col, _ = flipped
+                if instruments is not None:
+                    instruments.accepts["add" if grid[row][col] == 1 else "remove"] += 1
+                if tracker is not None:
+                    if grid[row][col] == 1:
+                        tracker.add(row, col)
+                    else:
+                        tracker.remove(row, col)
+            if trajectory is not None:
+                trajectory.record(grid, sweep)
+            if tracker is not None:
+                clusters.append((sweep,) + tracker.summary())
+        if instruments is not None:
+            # every step is accepted; the proposals are those of the physical time it covered
+            instruments.proposals += SWEEPS_PER_SAMPLE * GRID_WIDTH * GRID_HEIGHT
+            instruments.sweeps += SWEEPS_PER_SAMPLE
+        return round(np.mean(np.array(grid)) * 255)
+
+    if engine == "reference":
+        rng = RandomStream(GRID_WIDTH * GRID_HEIGHT, seed)
+        grid = [[0 for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
+        mol_num = 0
+
+        for sweep in range(1, SWEEPS_PER_SAMPLE + 1):
+            if instruments is None:
+                for _ in range(GRID_WIDTH * GRID_HEIGHT):
+                    grid, mol_num = glauber_dynamics(temp, poten, grid, mol_num, rng)
+            else:
+                for _ in range(GRID_WIDTH * GRID_HEIGHT):
+                    before = mol_num
+                    grid, mol_num = glauber_dynamics(temp, poten, grid, mol_num, rng)
+                    if mol_num != before:
+                        instruments.accepts["add" if mol_num > before else "remove"] += 1
+            if trajectory is not None:
+                trajectory.record(grid, sweep)
+            if clusters is not None:
+                clusters.append((sweep,) + cluster_stats(grid).summary())
+        if instruments is not None:
+            instruments.proposals += ITER_PER_SAMPLE
+            instruments.sweeps += SWEEPS_PER_SAMPLE
+
+        return round(np.mean(np.array(grid)) * 255)
+
+    grid = np.zeros((GRID_HEIGHT, GRID_WIDTH), dtype=np.int8)
+    rng = np.random.default_rng(seed)
+    table = acceptance_table(temp, poten)
+    masks = checkerboard_masks(GRID_HEIGHT, GRID_WIDTH)
+    sweep = lambda: checkerboard_sweep(grid, table, masks, rng)
+    if instruments is not None:
+        sweep = _counting(sweep, lambda: grid, instruments)
+    if trajectory is not None:
+        sweep = _recording(sweep, lambda: grid, trajectory)
+    if clusters is not None:
+        sweep = _tracking(sweep, lambda: grid, clusters)
+    for _ in range(SWEEPS_PER_SAMPLE):
+        sweep()
+
+    return round(np.mean(grid) * 255)
+
+def observable_stream(temp, poten, seed=None, engine="checkerboard", instruments=None):
+    """
+    Run sweeps forever from an empty grid, yielding (density, energy per cell) after every sweep,
+    where energy = -bonds - poten * mol_num as in glauber_dynamics. With checkerboard sweeps both are
+    tracked from the per-sweep deltas; with engine="cluster" they are recounted after each update.
+    """
+    if engine not in ("checkerboard", "cluster"):
+        raise ValueError(f"adaptive sampling needs the \"checkerboard\" or \"cluster\" engine, not {engine!r}")
+    grid = np.zeros((GRID_HEIGHT, GRID_WIDTH), dtype=np.int8)
+    mol_num = int(grid.sum())
+    bonds = bond_count(grid)
+    cells = GRID_WIDTH * GRID_HEIGHT
+
+    rng = np.random.default_rng(seed)
+    table = acceptance_table(temp, poten)
+    masks = checkerboard_masks(GRID_HEIGHT, GRID_WIDTH)
+    coupling, field = ising_couplings(poten, GRID_HEIGHT, GRID_WIDTH)
+    checkerboard = lambda: checkerboard_sweep(grid, table, masks, rng)
+    cluster = lambda: cluster_sweep(grid, temp, coupling, field, rng)
+    if instruments is not None:
+        checkerboard = _counting(checkerboard, lambda: grid, instruments)
+        cluster = _counting(cluster, lambda: grid, instruments)
+    while True:
+        if engine == "cluster":
+            cluster()
+            mol_num = int(grid.sum())
+            bonds = bond_count(grid)
+            yield mol_num / cells, (-bonds - poten * mol_num) / cells
+            continue
+        mol_change, bond_change = checkerboard()
+        mol_num += mol_change
+        bonds += bond_change
+        yield mol_num / cells, (-bonds - poten * mol_num) / cells
+
+def autocorrelation_time(series):
+    """
+    Integrated autocorrelation time of a 1D series, in samples, using Sokal's automatic
+    window (the smallest window M with M >= 5 * tau(M)). A constant series gives 0.5.
+    """
+    x = np.asarray(series, dtype=float) - np.mean(series)
+    n = len(x)
+    if n < 2 or not np.any(x):
+        return 0.5
+
+    spectrum = np.fft.rfft(x, 2 * n)
+    acf = np.fft.irfft(spectrum * np.conjugate(spectrum))[:n]
+    acf /= acf[0]
+
+    taus = 2 * np.cumsum(acf) - 1
+    windows = np.arange(n)
+    converged = windows >= 5 * taus
+    m = np.argmax(converged) if np.any(converged) else n - 1
+    return max(float(taus[m]) / 2, 0.5)
+
+def _drifting(a, b):
+    """Do two blocks of a time series have significantly different means?"""
+    error = math.sqrt((np.var(a) + np.var(b)) / len(a))
+    return abs(np.mean(a) - np.mean(b)) > DRIFT_SIGMAS * error + 1 / (GRID_WIDTH * GRID_HEIGHT)
+
+class SampleStats:
+    def __init__(self, density, error, sweeps, equilibration_sweeps, tau):
+        self.density = density # mean fraction of occupied cells after equilibration
+        self.error = error # standard error of density, corrected for autocorrelation
+        self.sweeps = sweeps # total sweeps used, including equilibration
+        self.equilibration_sweeps = equilibration_sweeps
+        self.tau = tau # integrated autocorrelation time of density, in sweeps
+
+def adaptive_simulate(temp, poten, seed=None, max_sweeps=MAX_SWEEPS_PER_SAMPLE, engine="checkerboard", instruments=None):
+    """
+    Sample one diagram point without a fixed sweep budget. Density and energy are streamed per
+    sweep; the point counts as equilibrated once two consecutive EQUILIBRATION_WINDOW blocks agree
+    in both, then sampling continues until INDEPENDENT_SAMPLES independent samples (by the
+    autocorrelation time of density) are collected or max_sweeps is hit.
+    """
+    if engine not in ("checkerboard", "cluster"):
+        raise ValueError(f"adaptive sampling needs the \"checkerboard\" or \"cluster\" engine, not {engine!r}")
+    stream = observable_stream(temp, poten, seed, engine, instruments)
+    densities = []
+    energies = []
+
+    # --- Equilibration ---
+    equilibration_sweeps = 0
+    while equilibration_sweeps < max_sweeps:
+        for _ in range(EQUILIBRATION_WINDOW):
+            density, energy = next(stream)
+            densities.append(density)
+            energies.append(energy)
+        equilibration_sweeps += EQUILIBRATION_WINDOW
+        if len(densities) < 2 * EQUILIBRATION_WINDOW:
+            continue
+        previous, latest = slice(-2 * EQUILIBRATION_WINDOW, -EQUILIBRATION_WINDOW), slice(-EQUILIBRATION_WINDOW, None)
+        if not (_drifting(densities[previous], densities[latest]) or _drifting(energies[previous], energies[latest])):
+            break
+
+    # --- Production ---
+    # the last block already passed the drift test, so keep it as the first production samples
+    samples = densities[-EQUILIBRATION_WINDOW:]
+    equilibration_sweeps -= EQUILIBRATION_WINDOW
+    while True:
+        tau = autocorrelation_time(samples)
+        if len(samples) / (2 * tau) >= INDEPENDENT_SAMPLES or equilibration_sweeps + len(samples) >= max_sweeps:
+            break
+        for _ in range(EQUILIBRATION_WINDOW):
+            samples.append(next(stream)[0])
+
+    error = float(np.std(samples)) * math.sqrt(2 * tau / len(samples))
+    return SampleStats(float(np.mean(samples)), error, equilibration_sweeps + len(samples), equilibration_sweeps, tau)
+
+def diagram_point(resolution, row, col):
+    """(temperature, potential) of one point of a resolution x resolution phase diagram"""
+    temp_step = (TEMP_MAX - TEMP_MIN)/resolution
+    poten_step = (POTENTIAL_MAX - POTENTIAL_MIN)/resolution
+    return TEMP_MIN + col * temp_step, POTENTIAL_MAX - row * poten_step
+
+def diagram_points(resolution=DIAGRAM_RESOLUTION):
+    """
+    List the (row, col, temperature, potential) of every point of the phase diagram.
+    Rows go down from POTENTIAL_MAX, columns go right from TEMP_MIN.
+    """
+    points = []
+    for p in range(0,resolution):
+        for t in range(0,resolution):
+            points.append((p, t) + diagram_point(resolution, p, t))
+    return points
+
+def _seed_identity(seed):
+    """JSON-able identity of a NumPy seed (int or SeedSequence)"""
+    if isinstance(seed, np.random.SeedSequence):
+        return [seed.entropy, list(seed.spawn_key)]
+    return int(seed)
+
+def store_key(engine, temp, poten, sweeps, seed):
+    """
+    Hex digest identifying one sample: model, grid size, temperature, potential, sweep budget,
+    seed and engine. Temperature and potential are rounded so that the same diagram point
+    reached through different float arithmetic gets the same key.
+    """
+    params = {
+        "model": MODEL, "height": GRID_HEIGHT, "width": GRID_WIDTH, "engine": engine,
+        "temperature": round(float(temp), 9), "potential": round(float(poten), 9),
+        "sweeps": int(sweeps), "seed": _seed_identity(seed),
+    }
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+def _record(engine, temp, poten, stats):
+    return (MODEL, GRID_HEIGHT, GRID_WIDTH, engine, temp, poten, stats.density, stats.error,
+            stats.sweeps, stats.equilibration_sweeps, stats.tau)
+
+def _stats(record):
+    return SampleStats(float(record["density"]), float(record["error"]), int(record["sweeps"]),
+                       int(record["equilibration_sweeps"]), float(record["tau"]))
+
+def save_checkpoint(path, params, state, arrays):
+    """
+    Write params and state (both as JSON) and arrays to the .npz file at path. It is written to a
+    temporary file next to path and renamed into place, so a killed run leaves the previous
+    checkpoint whole.
+    """
+    fd, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez_compressed(f, params=json.dumps(params, sort_keys=True), state=json.dumps(state), **arrays)
+        os.replace(temporary, path)
+    except BaseException:
+        os.remove(temporary)
+        raise
+
+def load_checkpoint(path, params):
+    """(state, arrays) of the checkpoint at path, or None if there is none; raises if another sweep saved it"""
+    try:
+        data = np.load(path)
+    except FileNotFoundError:
+        return None
+    with data:
+        saved = json.loads(str(data["params"]))
+        if saved != json.loads(json.dumps(params, sort_keys=True)):
+            raise ValueError(f"{path} is the checkpoint of another sweep: {saved}")
+        return json.loads(str(data["state"])), {name: data[name] for name in data.files if name not in ("params", "state")}
+
+def _checkpoint_params(sweep, resolution, engine, seed, sweeps):
+    return {
+        "model": MODEL, "height": GRID_HEIGHT, "width": GRID_WIDTH, "sweep": sweep, "resolution": resolution,
+        "engine": engine, "seed": None if seed is None else _seed_identity(seed), "sweeps": sweeps,
+        "diagram": [TEMP_MIN, TEMP_MAX, POTENTIAL_MIN, POTENTIAL_MAX],
+    }
+
+class Checkpoint:
+    """
+    Progress of one diagram sweep, kept in a checkpoint file at path (None for no checkpoints).
+    arrays are the sweep's own result arrays, which it fills in place; state is a dict of anything
+    else it needs to go on, saved as JSON along with the instrument counts of all finished work.
+    If path already holds a checkpoint of the same sweep, both are restored from it on creation.
+    """
+    def __init__(self, path, params, arrays, state=None, instruments=None, interval=CHECKPOINT_INTERVAL):
+        self.path = path
+        self.params = params
+        self.arrays = arrays
+        self.state = state if state is not None else {}
+        self.instruments = instruments
+        self.interval = interval
+        self.counts = Instruments(MOVES, PHASES, enabled=True, export=None)
+        self.last = time.perf_counter()
+
+        saved = load_checkpoint(path, params) if path is not None else None
+        self.resumed = saved is not None
+        if saved is not None:
+            state, arrays = saved
+            for name, array in self.arrays.items():
+                array[...] = arrays[name]
+            self.merge(state.pop("counts"))
+            self.state.update(state)
+
+    def merge(self, counts):
+        """Add the instrument counts of a finished task to the checkpoint and to the sweep's instruments"""
+        if counts is None:
+            return
+        self.counts.merge(counts)
+        if self.instruments is not None:
+            self.instruments.merge(counts)
+
+    def save(self):
+        if self.path is None:
+            return
+        save_checkpoint(self.path, self.params, dict(self.state, counts=self.counts.counts()), self.arrays)
+        self.last = time.perf_counter()
+
+    def update(self):
+        """Save if the last save is at least interval seconds old"""
+        if time.perf_counter() - self.last >= self.interval:
+            self.save()
+
+def _task_instruments(instrument):
+    """A pool worker's own Instruments for one task, or None if the sweep is not instrumented"""
+    return Instruments(MOVES, PHASES, enabled=True, export=None) if instrument else None
+
+def _sample_point(task):
+    row, col, temp, poten, engine, seed, store, instrument = task
+    instruments = _task_instruments(instrument)
+    record = None
+    if store is not None:
+        store = ResultStore(store)
+        key = store_key(engine, temp, poten, SWEEPS_PER_SAMPLE, seed)
+        record = store.get(key)
+    if record is not None:
+        return row, col, round(record["density"] * 255), None
+
+    with instruments.timer("sample") if instruments else contextlib.nullcontext():
+        value = sample_simulate(temp, poten, engine, seed, instruments)
+    if store is not None:
+        # fixed-length runs carry no error estimate
+        stats = SampleStats(value / 255, math.nan, SWEEPS_PER_SAMPLE, 0, math.nan)
+        store.put(key, _record(engine, temp, poten, stats))
+    return row, col, value, instruments.counts() if instruments else None
+
+def _sample_row(task):
+    row, temps, potens, engine, seed = task
+    if engine == "tempering":
+        # every point of a row shares its potential
+        return (row,) + tempering_simulate(temps, potens[0], seed)
+    return row, ensemble_simulate(temps, potens, seed), None
+
+def _adaptive_point(task):
+    row, col, temp, poten, engine, seed, store, instrument = task
+    instruments = _task_instruments(instrument)
+    record = None
+    if store is not None:
+        store = ResultStore(store)
+        key = store_key(ADAPTIVE_PREFIX + engine, temp, poten, MAX_SWEEPS_PER_SAMPLE, seed)
+        record = store.get(key)
+    if record is not None:
+        return row, col, _stats(record), None
+
+    with instruments.timer("sample") if instruments else contextlib.nullcontext():
+        stats = adaptive_simulate(temp, poten, seed, engine=engine, instruments=instruments)
+    if store is not None:
+        store.put(key, _record(ADAPTIVE_PREFIX + engine, temp, poten, stats))
+    return row, col, stats, instruments.counts() if instruments else None
+
+def sweep_diagram(resolution=DIAGRAM_RESOLUTION, engine=ENGINE, seed=SEED, workers=WORKERS, store=None,
+                  instruments=None, checkpoint=None):
+    """
+    Sample every diagram point on a process pool and return the densities (0-255) as a
+    resolution x resolution array. Each point draws from its own SeedSequence child of seed,
+    so the result does not depend on the number of workers or on scheduling order.
+    Points are handed out one at a time, since those near coexistence take the longest.
+    With the "ensemble" and "tempering" engines each task is instead a whole row, run as one
+    batch with one stream per row. With "decomposed" the points run one after another in this
+    process, each split into strips over WORKERS processes of its own.
+    If store names a ResultStore directory, points already in it are read back instead of
+    simulated and new points are added to it (not for the row engines, whose rows share a stream).
+    Given Instruments, the counts and timings of every simulated point are merged into them.
+    Given a checkpoint file, finished points are saved to it and not simulated again (not for the
+    row engines either).
+    """
+    if engine in ("ensemble", "tempering"):
+        return _sweep_diagram_rows(resolution, seed, workers, engine)[0]
+
+    diagram = np.zeros((resolution, resolution), dtype=int)
+    done = np.zeros((resolution, resolution), dtype=bool)
+    checkpoint = Checkpoint(checkpoint, _checkpoint_params("fixed", resolution, engine, seed, SWEEPS_PER_SAMPLE),
+                            {"diagram": diagram, "done": done}, instruments=instruments)
+
+    points = diagram_points(resolution)
+    seeds = np.random.SeedSequence(seed).spawn(len(points))
+    tasks = [(row, col, temp, poten, engine, s, store, instruments is not None)
+             for (row, col, temp, poten), s in zip(points, seeds) if not done[row, col]]
+
+    # pool workers cannot start the strip processes of their own
+    for row, col, value, counts in run_tasks(_sample_point, tasks, 1 if engine == "decomposed" else workers):
+        diagram[row, col] = value
+        done[row, col] = True
+        checkpoint.merge(counts)
+        checkpoint.update()
+    checkpoint.save()
+    return diagram
+
+def _sweep_diagram_rows(resolution, seed, workers, engine):
+    points = np.array(diagram_points(resolution)).reshape(resolution, resolution, 4)
+    seeds = np.random.SeedSequence(seed).spawn(resolution)
+    tasks = [(row, points[row, :, 2], points[row, :, 3], engine, seeds[row]) for row in range(resolution)]
+
+    diagram = np.zeros((resolution, resolution), dtype=int)
+    swap_rates = np.zeros((resolution, resolution - 1))
+    for row, values, rates in run_tasks(_sample_row, tasks, workers):
+        diagram[row] = values
+        if rates is not None:
+            swap_rates[row] = rates
+    return diagram, swap_rates
+
+def sweep_diagram_tempering(resolution=DIAGRAM_RESOLUTION, seed=SEED, workers=WORKERS):
+    """
+    Run every diagram row as one replica-exchange ensemble over its temperatures.
+    Returns the densities (0-255) and, per row, the swap acceptance rate between neighboring columns.
+    """
+    return _sweep_diagram_rows(resolution, seed, workers, "tempering")
+
+def sweep_diagram_adaptive(resolution=DIAGRAM_RESOLUTION, seed=SEED, workers=WORKERS, engine="checkerboard",
+                           store=None, instruments=None, checkpoint=None):
+    """
+    Like sweep_diagram but every point runs adaptive_simulate with the "checkerboard" or "cluster"
+    engine. Returns three resolution x resolution arrays: density (0-255), its standard error (0-255)
+    and sweeps used. Stored points report the sweeps they took when they were first simulated.
+    Checkpoints as in sweep_diagram.
+    """
+    if engine not in ("checkerboard", "cluster"):
+        raise ValueError(f"adaptive sampling needs the \"checkerboard\" or \"cluster\" engine, not {engine!r}")
+    diagram = np.zeros((resolution, resolution))
+    errors = np.zeros((resolution, resolution))
+    sweeps = np.zeros((resolution, resolution), dtype=int)
+    done = np.zeros((resolution, resolution), dtype=bool)
+    checkpoint = Checkpoint(checkpoint, _checkpoint_params("adaptive", resolution, engine, seed, MAX_SWEEPS_PER_SAMPLE),
+                            {"diagram": diagram, "errors": errors, "sweeps": sweeps, "done": done},
+                            instruments=instruments)
+
+    points = diagram_points(resolution)
+    seeds = np.random.SeedSequence(seed).spawn(len(points))
+    tasks = [(row, col, temp, poten, engine, s, store, instruments is not None)
+             for (row, col, temp, poten), s in zip(points, seeds) if not done[row, col]]
+
+    for row, col, stats, counts in run_tasks(_adaptive_point, tasks, workers):
+        checkpoint.merge(counts)
+        diagram[row, col] = stats.density * 255
+        errors[row, col] = stats.error * 255
+        sweeps[row, col] = stats.sweeps
+        done[row, col] = True
+        checkpoint.update()
+    checkpoint.save()
+    return diagram, errors, sweeps
+
+def _cluster_point(task):
+    row, col, temp, poten, engine, seed = task
+    records = []
+    sample_simulate(temp, poten, engine, seed, clusters=records)
+    # average over the second half of the run, past the nucleation from the empty grid
+    records = np.array(records[len(records) // 2:], dtype=float)
+    return row, col, records[:, 1:].mean(axis=0)
+
+def sweep_diagram_clusters(resolution=DIAGRAM_RESOLUTION, engine=ENGINE, seed=SEED, workers=WORKERS):
+    """
+    Like sweep_diagram, but every point returns cluster observables averaged over the second half
+    of its SWEEPS_PER_SAMPLE sweeps: a dict of resolution x resolution arrays keyed by the fields
+    of CLUSTER_FIELDS, with "largest_fraction" scaled to 0-255 like the densities and
+    "percolating" the fraction of sweeps in which some cluster spanned the grid.
+    Not for the "ensemble", "tempering" and "decomposed" engines.
+    """
+    points = diagram_points(resolution)
+    seeds = np.random.SeedSequence(seed).spawn(len(points))
+    tasks = [(row, col, temp, poten, engine, s) for (row, col, temp, poten), s in zip(points, seeds)]
+
+    diagrams = {field: np.zeros((resolution, resolution)) for field in CLUSTER_FIELDS[1:]}
+    for row, col, means in run_tasks(_cluster_point, tasks, workers):
+        for field, mean in zip(CLUSTER_FIELDS[1:], means):
+            diagrams[field][row, col] = mean
+    diagrams["largest_fraction"] *= 255
+    return diagrams
+
+def continuation_steps(points, sweeps=CONTINUATION_SWEEPS):
+    """
+    (point index, sweeps, branch) of every step of a continuation walk over points: forward
+    (branch 0) with SWEEPS_PER_SAMPLE sweeps at the first point, then back (branch 1)
+    """
+    return ([(i, SWEEPS_PER_SAMPLE if i == 0 else sweeps, 0) for i in range(len(points))] +
+            [(i, sweeps, 1) for i in range(len(points) - 1, -1, -1)])
+
+def continuation_walk(grid, rng, points, steps, engine="checkerboard", instruments=None):
+    """
+    Run steps of a continuation walk over the (temp, poten) points on grid, in place, drawing from
+    the Generator rng. Yields (point index, branch, density 0-255) after every step, so a walk can
+    be stopped between steps and taken up again from the grid and the generator's state.
+    """
+    if engine not in ("checkerboard", "cluster"):
+        raise ValueError(f"continuation needs the \"checkerboard\" or \"cluster\" engine, not {engine!r}")
+    masks = checkerboard_masks(GRID_HEIGHT, GRID_WIDTH)
+    for i, count, branch in steps:
+        temp, poten = points[i]
+        if engine == "cluster":
+            coupling, field = ising_couplings(poten, GRID_HEIGHT, GRID_WIDTH)
+            sweep = lambda: cluster_sweep(grid, temp, coupling, field, rng)
+        else:
+            table = acceptance_table(temp, poten)
+            sweep = lambda: checkerboard_sweep(grid, table, masks, rng)
+        if instruments is not None:
+            sweep = _counting(sweep, lambda: grid, instruments)
+        for _ in range(count):
+            sweep()
+        yield i, branch, round(np.mean(grid) * 255)
+
+def continuation_simulate(points, engine="checkerboard", seed=None, sweeps=CONTINUATION_SWEEPS, instruments=None):
+    """
+    Walk the (temp, poten) points in order on one lattice. The first point runs SWEEPS_PER_SAMPLE
+    sweeps from an empty grid like sample_simulate, every later one only sweeps more from the
+    lattice the previous point left. Then walk the points back from where the forward walk ended.
+    Returns the densities (0-255) of the forward and the reverse walk, both in the order of points.
+    """
+    grid = np.zeros((GRID_HEIGHT, GRID_WIDTH), dtype=np.int8)
+    densities = np.zeros((2, len(points)), dtype=int)
+    steps = continuation_steps(points, sweeps)
+    for i, branch, density in continuation_walk(grid, np.random.default_rng(seed), points, steps, engine, instruments):
+        densities[branch, i] = density
+    return densities[0].tolist(), densities[1].tolist()
+
+def continuation_chains(resolution=DIAGRAM_RESOLUTION, path="serpentine"):
+    """The chains of (row, col) diagram points that sweep_diagram_continuation walks, each in order"""
+    if path not in CONTINUATION_PATHS:
+        raise ValueError(f"unknown path {path!r}, expected one of {CONTINUATION_PATHS}")
+    if path == "serpentine":
+        return [[(row, col) for row in range(resolution)
+                 for col in (range(resolution) if row % 2 == 0 else range(resolution - 1, -1, -1))]]
+    # rows go down from POTENTIAL_MAX, so the potential rises from the last row up
+    return [[(row, col) for row in range(resolution - 1, -1, -1)] for col in range(resolution)]
+
+def _continuation_segment(task):
+    """
+    Go on with one chain's walk from step position, its grid and its generator state (None for a
+    new generator from seed), until the walk ends or, given a budget, budget seconds have passed
+    """
+    chain, points, engine, seed, sweeps, instrument, position, grid, state, budget = task
+    instruments = _task_instruments(instrument)
+    rng = np.random.default_rng(seed)
+    if state is not None:
+        rng.bit_generator.state = state
+
+    results = []
+    start = time.perf_counter()
+    steps = continuation_steps(points, sweeps)[position:]
+    with instruments.timer("sample") if instruments else contextlib.nullcontext():
+        for result in continuation_walk(grid, rng, points, steps, engine, instruments):
+            results.append(result)
+            if budget is not None and time.perf_counter() - start >= budget:
+                break
+    return chain, position + len(results), grid, rng.bit_generator.state, results, \
+        instruments.counts() if instruments else None
+
+def sweep_diagram_continuation(resolution=DIAGRAM_RESOLUTION, path="serpentine", engine="checkerboard", seed=SEED,
+                               workers=WORKERS, sweeps=CONTINUATION_SWEEPS, instruments=None, checkpoint=None):
+    """
+    Run continuation_simulate along every chain of continuation_chains(resolution, path) on a
+    process pool, each chain from its own SeedSequence child of seed. Returns the densities (0-255)
+    of the forward and the reverse walks as two resolution x resolution arrays; where they differ,
+    the lattice kept the phase it came from. A chain of n points costs SWEEPS_PER_SAMPLE + (2n - 1)
+    * sweeps sweeps for both branches, against n * SWEEPS_PER_SAMPLE for sweep_diagram's one.
+    Given a checkpoint file, the chains run in segments of about CHECKPOINT_INTERVAL seconds, and
+    their lattices and generator states are saved between segments along with the densities.
+    """
+    chains = continuation_chains(resolution, path)
+    seeds = np.random.SeedSequence(seed).spawn(len(chains))
+    points = [[diagram_point(resolution, row, col) for row, col in chain] for chain in chains]
+
+    forward = np.zeros((resolution, resolution), dtype=int)
+    reverse = np.zeros((resolution, resolution), dtype=int)
+    positions = np.zeros(len(chains), dtype=int) # steps of continuation_steps done per chain
+    grids = np.zeros((len(chains), GRID_HEIGHT, GRID_WIDTH), dtype=np.int8)
+    checkpoint = Checkpoint(checkpoint, _checkpoint_params("continuation-" + path, resolution, engine, seed, sweeps),
+                            {"forward": forward, "reverse": reverse, "positions": positions, "grids": grids},
+                            {"rng": [None] * len(chains)}, instruments)
+    budget = checkpoint.interval if checkpoint.path is not None else None
+
+    while True:
+        tasks = [(i, points[i], engine, seeds[i], sweeps, instruments is not None, positions[i], grids[i],
+                  checkpoint.state["rng"][i], budget)
+                 for i in range(len(chains)) if positions[i] < 2 * len(chains[i])]
+        if not tasks:
+            break
+        for i, position, grid, state, results, counts in run_tasks(_continuation_segment, tasks, workers):
+            for index, branch, density in results:
+                (reverse if branch else forward)[chains[i][index]] = density
+            positions[i] = position
+            grids[i] = grid
+            checkpoint.state["rng"][i] = state
+            checkpoint.merge(counts)
+            checkpoint.update()
+    checkpoint.save()
+    return forward, reverse
+
+def _logsumexp(x, axis=None):
+    peak = np.max(x, axis=axis, keepdims=True)
+    peak = np.where(np.isfinite(peak), peak, 0)
+    return np.squeeze(peak, axis=axis) + np.log(np.sum(np.exp(x - peak), axis=axis))
+
+class Histogram:
+    """
+    Joint histogram of (bonds, mol_num) visited by one run at (temperature, potential),
+    stored sparsely as the distinct states and how often each was seen.
+    """
+    def __init__(self, temperature, potential, bonds, mol_nums):
+        self.temperature = temperature
+        self.potential = potential
+        states, self.counts = np.unique(np.stack((bonds, mol_nums), axis=1), axis=0, return_counts=True)
+        self.bonds = states[:, 0]
+        self.mol_nums = states[:, 1]
+
+    def __len__(self):
+        return int(self.counts.sum())
+
+    def keys(self):
+        """Every state as one integer, bonds * (cells + 1) + mol_num"""
+        return self.bonds * (GRID_WIDTH * GRID_HEIGHT + 1) + self.mol_nums
+
+    def overlap(self, other):
+        """The smaller of the fractions of either run's samples that fall on states the other run visited"""
+        mine = self.keys()
+        theirs = other.keys()
+        return min(self.counts[np.isin(mine, theirs)].sum() / len(self), other.counts[np.isin(theirs, mine)].sum() / len(other))
+
+    def degenerate(self):
+        """True if bonds or mol_num never changed: the run then says nothing about g away from its one value"""
+        return len(np.unique(self.bonds)) < 2 or len(np.unique(self.mol_nums)) < 2
+
+    def spread(self, tail=REWEIGHT_TAIL):
+        """((low bonds, low mol_num), (high bonds, high mol_num)), leaving out a fraction tail of the samples at either end"""
+        spread = np.zeros((2, 2))
+        for i, values in enumerate((self.bonds, self.mol_nums)):
+            order = np.argsort(values)
+            cumulative = np.cumsum(self.counts[order]) / len(self)
+            spread[0, i] = values[order][np.searchsorted(cumulative, tail, side="right")]
+            spread[1, i] = values[order][np.searchsorted(cumulative, 1 - tail)]
+        return spread
+
+def _overlapping(histograms, min_overlap=REWEIGHT_MIN_OVERLAP):
+    """Indices of the histograms linked to the first one by a chain of overlaps of at least min_overlap"""
+    linked = [0]
+    pending = list(range(1, len(histograms)))
+    for i in linked:
+        joined = [j for j in pending if histograms[i].overlap(histograms[j]) >= min_overlap]
+        linked.extend(joined)
+        pending = [j for j in pending if j not in joined]
+    return sorted(linked)
+
+def record_histogram(temp, poten, seed=None, sweeps=SWEEPS_PER_SAMPLE, equilibration=HISTOGRAM_EQUILIBRATION):
+    """Checkerboard-sweep one point and histogram (bonds, mol_num) over the sweeps after equilibration"""
+    if sweeps <= equilibration:
+        raise ValueError(f"{sweeps} sweeps leave nothing to record after {equilibration} sweeps of equilibration")
+    grid = np.zeros((GRID_HEIGHT, GRID_WIDTH), dtype=np.int8)
+    rng = np.random.default_rng(seed)
+    table = acceptance_table(temp, poten)
+    masks = checkerboard_masks(GRID_HEIGHT, GRID_WIDTH)
+
     mol_num = 0
+    bonds = 0
+    samples = np.zeros((sweeps - equilibration, 2), dtype=int)
+    for sweep in range(sweeps):
+        mol_change, bond_change = checkerboard_sweep(grid, table, masks, rng)
+        mol_num += mol_change
+        bonds += bond_change
+        if sweep >= equilibration:
+            samples[sweep - equilibration] = bonds, mol_num
+    return Histogram(temp, poten, samples[:, 0], samples[:, 1])
+
+class DensityOfStates:
+    """
+    Log density of states g(bonds, mol_num) up to a constant. Since the lattice-gas weight is
+    exp((bonds + potential * mol_num) / temperature), averages at any (T, mu) follow by reweighting.
+    Only trustworthy where the histograms it came from have support, so density() is NaN elsewhere;
+    counts holds how many samples of the histograms fell on each state and spreads the Histogram.spread
+    of each of them.
+    """
+    def __init__(self, bonds, mol_nums, log_g, counts, spreads):
+        self.bonds = bonds
+        self.mol_nums = mol_nums
+        self.log_g = log_g
+        self.counts = counts
+        self.spreads = spreads
+
+    @classmethod
+    def from_histograms(cls, histograms, tolerance=WHAM_TOLERANCE, max_iterations=WHAM_ITERATIONS):
+        """
+        Multiple-histogram (Ferrenberg-Swendsen / WHAM) estimate: iterate
+        g(s) = sum_k h_k(s) / sum_k n_k exp(a_k(s) - f_k) and f_k = log sum_s g(s) exp(a_k(s)),
+        a_k(s) = (bonds + mu_k * mol_num) / T_k, until the free energies f_k settle.
+        A single histogram reduces to plain single-histogram reweighting. Runs that share no states
+        leave their relative f_k undetermined, so the histograms must all be linked by overlaps of
+        at least REWEIGHT_MIN_OVERLAP.
+        """
+        if len(_overlapping(histograms)) < len(histograms):
+            raise ValueError("the histograms do not overlap enough to be combined")
+        keys = [h.keys() for h in histograms]
+        union = np.unique(np.concatenate(keys))
+        bonds, mol_nums = np.divmod(union, GRID_WIDTH * GRID_HEIGHT + 1)
+
+        totals = np.zeros(len(union))
+        for h, key in zip(histograms, keys):
+            totals[np.searchsorted(union, key)] += h.counts
+        log_samples = np.log([len(h) for h in histograms])
+        exponents = np.array([(bonds + h.potential * mol_nums) / h.temperature for h in histograms])
+
+        free_energies = np.zeros(len(histograms))
+        for _ in range(max_iterations):
+            log_g = np.log(totals) - _logsumexp(log_samples[:, None] + exponents - free_energies[:, None], axis=0)
+            updated = _logsumexp(log_g[None, :] + exponents, axis=1)
+            updated -= updated[0]
+            converged = np.max(np.abs(updated - free_energies)) < tolerance
+            free_energies = updated
+            if converged:
+                break
+        return cls(bonds, mol_nums, log_g, totals, np.array([h.spread() for h in histograms]))
+
+    def density(self, temperature, potential, min_samples=REWEIGHT_MIN_SAMPLES):
+        """
+        Mean fraction of occupied cells at (temperature, potential), or NaN if the reweighted
+        distribution p(s) rests on fewer than min_samples effective samples, 1 / sum_s p(s)^2 / counts(s),
+        or if its mean bonds and mol_num do not both fall within the spread of one of the runs: then it
+        has moved off the states the runs visited, or piled up on the edge of them, and the average
+        would be an extrapolation.
+        """
+        log_weights = self.log_g + (self.bonds + potential * self.mol_nums) / temperature
+        weights = np.exp(log_weights - np.max(log_weights))
+        p = weights / weights.sum()
+        if 1 / np.sum(p**2 / self.counts) < min_samples:
+            return math.nan
+        mean = np.array((np.dot(p, self.bonds), np.dot(p, self.mol_nums)))
+        if not np.any(np.all((self.spreads[:, 0] <= mean) & (mean <= self.spreads[:, 1]), axis=1)):
+            return math.nan
+        return mean[1] / (GRID_WIDTH * GRID_HEIGHT)
+
+def _histogram_point(task):
+    row, col, temp, poten, seed = task
+    return row, col, record_histogram(temp, poten, seed)
+
+def sweep_histograms(resolution=HISTOGRAM_RESOLUTION, seed=SEED, workers=WORKERS):
+    """Record a Histogram at every point of a coarse resolution x resolution diagram"""
+    points = diagram_points(resolution)
+    seeds = np.random.SeedSequence(seed).spawn(len(points))
+    tasks = [(row, col, temp, poten, s) for (row, col, temp, poten), s in zip(points, seeds)]
+    return [h for _, _, h in sorted(run_tasks(_histogram_point, tasks, workers), key=lambda r: r[:2])]
 
-    for _ in range(ITER_PER_SAMPLE):
-        grid, mol_num = glauber_dynamics(temp, poten, grid, mol_num)
+def _diagram_position(temp, poten):
+    return np.array(((temp - TEMP_MIN) / (TEMP_MAX - TEMP_MIN), (poten - POTENTIAL_MIN) / (POTENTIAL_MAX - POTENTIAL_MIN)))
 
-    # temporary print
-    return round(np.mean(np.array(grid)) * 255)
+def reweighted_diagram(histograms, resolution=DIAGRAM_RESOLUTION, neighbors=REWEIGHT_NEIGHBORS):
+    """
+    Densities (0-255) on a resolution x resolution diagram, at any resolution, reweighted from a
+    handful of actual runs, and the fraction of its points they cover. Each point combines the run
+    closest to it on the diagram with those of the `neighbors` closest (all of them if None) that
+    overlap it, directly or through each other, into one DensityOfStates; runs that share no states
+    cannot be combined. Degenerate runs, frozen in one state, only count at their own point. Points
+    the combined histograms do not cover are NaN.
+    """
+    positions = np.array([_diagram_position(h.temperature, h.potential) for h in histograms])
+    degenerate = np.array([h.degenerate() for h in histograms])
+    estimates = {}
+    diagram = np.full((resolution, resolution), math.nan)
+    for row, col, temp, poten in diagram_points(resolution):
+        distances = np.sum((positions - _diagram_position(temp, poten))**2, axis=1)
+        usable = ~degenerate | (distances < 1e-12)
+        if not usable.any():
+            continue
+        nearest = np.argsort(np.where(usable, distances, np.inf))[:min(neighbors or len(histograms), usable.sum())]
+        nearest = tuple(sorted(nearest[_overlapping([histograms[i] for i in nearest])]))
+        if nearest not in estimates:
+            estimates[nearest] = DensityOfStates.from_histograms([histograms[i] for i in nearest])
+        diagram[row, col] = estimates[nearest].density(temp, poten) * 255
+    return diagram, np.count_nonzero(~np.isnan(diagram)) / diagram.size
+
+def _split(first, last):
+    """Halves of the index range [first, last], or just itself if it cannot be split"""
+    if last - first <= 1:
+        return [(first, last)]
+    middle = (first + last) // 2
+    return [(first, middle), (middle, last)]
+
+def _needs_refinement(corners):
+    densities = [stats.density * 255 for stats in corners]
+    errors = [stats.error * 255 for stats in corners]
+    return max(densities) - min(densities) > REFINE_THRESHOLD or max(errors) > REFINE_ERROR
+
+def _bilinear(corners, rows, cols):
+    """Values over a rows x cols cell from its top-left, top-right, bottom-left, bottom-right corners"""
+    y = np.linspace(0, 1, rows)[:, None]
+    x = np.linspace(0, 1, cols)[None, :]
+    top_left, top_right, bottom_left, bottom_right = corners
+    return (top_left * (1 - x) + top_right * x) * (1 - y) + (bottom_left * (1 - x) + bottom_right * x) * y
+
+def sweep_diagram_quadtree(resolution=QUADTREE_RESOLUTION, seed=SEED, workers=WORKERS, store=None, instruments=None):
+    """
+    Adaptive sweep of a resolution x resolution diagram. Starts from QUADTREE_INITIAL x QUADTREE_INITIAL
+    cells and splits a cell in four while its corners differ by more than REFINE_THRESHOLD (0-255) or
+    any corner's error exceeds REFINE_ERROR, down to neighboring grid points. Each level of new corners
+    is sampled on the pool with adaptive_simulate, seeded by (seed, row, col) so results do not depend
+    on the order of refinement. With a store, points are shared with earlier runs as in sweep_diagram_adaptive.
+    Returns the sampled points as an (n, 5) array of (temperature, potential, density, error, sweeps),
+    density and error in 0-255, and a resolution x resolution raster interpolated from the leaves.
+    """
+    last = resolution - 1
+    edges = np.linspace(0, last, QUADTREE_INITIAL + 1).astype(int)
+    cells = [(r0, r1, c0, c1) for r0, r1 in zip(edges, edges[1:]) for c0, c1 in zip(edges, edges[1:])]
+
+    sampled = {}
+    leaves = []
+    while cells:
+        # --- Sample every new corner of this level at once ---
+        corners = {(r, c) for r0, r1, c0, c1 in cells for r in (r0, r1) for c in (c0, c1)} - sampled.keys()
+        tasks = [(r, c) + diagram_point(resolution, r, c)
+                 + ("checkerboard", np.random.SeedSequence(seed, spawn_key=(r, c)), store, instruments is not None)
+                 for r, c in sorted(corners)]
+        for row, col, stats, counts in run_tasks(_adaptive_point, tasks, workers):
+            sampled[(row, col)] = stats
+            if counts is not None:
+                instruments.merge(counts)
+
+        # --- Split the cells that are not flat enough ---
+        refined = []
+        for r0, r1, c0, c1 in cells:
+            finest = r1 - r0 <= 1 and c1 - c0 <= 1
+            if finest or not _needs_refinement([sampled[(r, c)] for r in (r0, r1) for c in (c0, c1)]):
+                leaves.append((r0, r1, c0, c1))
+                continue
+            refined += [(a, b, c, d) for a, b in _split(r0, r1) for c, d in _split(c0, c1)]
+        cells = refined
+
+    # Big leaves first, so finer leaves and then the samples themselves overwrite shared edges
+    raster = np.zeros((resolution, resolution))
+    for r0, r1, c0, c1 in sorted(leaves, key=lambda cell: (cell[1] - cell[0]) * (cell[3] - cell[2]), reverse=True):
+        corners = [sampled[(r, c)].density * 255 for r in (r0, r1) for c in (c0, c1)]
+        raster[r0:r1 + 1, c0:c1 + 1] = _bilinear(corners, r1 - r0 + 1, c1 - c0 + 1)
+    points = []
+    for (row, col), stats in sorted(sampled.items()):
+        raster[row, col] = stats.density * 255
+        points.append(diagram_point(resolution, row, col) + (stats.density * 255, stats.error * 255, stats.sweeps))
+    return np.array(points), raster
 
 def main():
-    temp_step = (TEMP_MAX - TEMP_MIN)/DIAGRAM_RESOLUTION
-    poten_step = (POTENTIAL_MAX - POTENTIAL_MIN)/DIAGRAM_RESOLUTION
-    
-    for p in range (0,DIAGRAM_RESOLUTION):
-        row = []
-        for t in range(0,DIAGRAM_RESOLUTION):
-            curr_temp = TEMP_MIN + t * temp_step
-            curr_potential = POTENTIAL_MAX - p * poten_step
-            sample_mean = sample_simulate(curr_temp,curr_potential)
-            row.append(sample_mean)
-        print(row)
+    parser = argparse.ArgumentParser(description="Sample the phase diagram of the lattice gas")
+    parser.add_argument("--resume", action="store_true",
+                        help="go on from the checkpoint of an interrupted run instead of starting over")
+    parser.add_argument("--checkpoint", default=CHECKPOINT, help="file the sweep saves its progress to")
+    args = parser.parse_args()
+    if os.path.exists(args.checkpoint):
+        if args.resume:
+            print(f"resuming from {args.checkpoint}")
+        else:
+            os.remove(args.checkpoint)
+
+    instruments = Instruments(MOVES, PHASES, enabled=True, export=STATS_EXPORT) if INSTRUMENT else None
+    try:
+        if CONTINUATION is not None:
+            diagram, reverse = sweep_diagram_continuation(path=CONTINUATION, instruments=instruments,
+                                                          checkpoint=args.checkpoint)
+            print("reverse branch:")
+            for row in reverse:
+                print(row.tolist())
+            print(f"hysteresis (forward - reverse) at {np.count_nonzero(diagram != reverse)} points:")
+            for row in diagram - reverse:
+                print(row.tolist())
+            print("forward branch:")
+        elif ADAPTIVE:
+            diagram, errors, sweeps = sweep_diagram_adaptive(store=STORE_DIR, instruments=instruments,
+                                                             checkpoint=args.checkpoint)
+            diagram = np.rint(diagram).astype(int)
+            print(f"sweeps used: {sweeps.sum()} (fixed budget: {sweeps.size * SWEEPS_PER_SAMPLE})")
+        else:
+            diagram = sweep_diagram(store=STORE_DIR, instruments=instruments, checkpoint=args.checkpoint)
+        for row in diagram:
+            print(row.tolist())
+    finally:
+        # an interrupted sweep still reports and exports the counts of the points it finished
+        if instruments is not None:
+            record = instruments.report()
+            print(f"{instruments.sweeps} sweeps, {record['sweeps_per_second']:.1f} sweeps/s, "
+                  f"{record['proposals_per_second']:.3g} proposals/s, {record['sample_ms']:.1f} ms per sample")
+            print("accepted " + ", ".join(f"{move} {record[f'accept_{move}']:.1%}" for move in MOVES))
+            instruments.close()
 
 
 if __name__ == "__main__":
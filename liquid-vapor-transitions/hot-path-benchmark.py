@@ -0,0 +1,272 @@
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import time
+import timeit
+import numpy as np
+from lattice_view import RENDER_MODES, LatticeRenderer
+
+# Headless benchmarks of the simulation and (offscreen) rendering hot paths. Results are written as JSON;
+# given a baseline file from an earlier run, the script exits with status 1 if any result got
+# slower than the baseline by more than REGRESSION_THRESHOLD.
+#
+#   python hot-path-benchmark.py --output before.json
+#   python hot-path-benchmark.py --baseline before.json
+
+# --- Benchmark Constants ---
+SIZES = [(20, 40), (128, 128), (512, 512), (2048, 2048)] # (height, width)
+TEMPERATURES = [0.5, 1.5]
+POTENTIAL = -2.0 # on the coexistence line at low temperature, where the dynamics is slowest
+ENGINES = ["reference", "checkerboard", "nfold", "packed", "cluster"] # of glauber-phase-sampler.py
+PYTHON_MAX_CELLS = 512 * 512 # bigger lattices are skipped by the list-of-lists (pure Python) benchmarks
+TIME_BUDGET = 1.0 # seconds spent repeating each measurement
+CALL_REPEATS = 5 # whole sample_simulate calls are timed this many times and the fastest is kept, as timeit advises
+RENDER_CHANGE = 0.01 # fraction of cells flipped between frames
+RENDER_MAX_PIXELS = 2048 # cells are scaled down so the frame is at most this many pixels across
+CLUSTER_DENSITY = 0.6 # random lattices labelled by bench_clusters, near site percolation where clusters are largest
+SEED = 2024
+
+# --- Results ---
+OUTPUT = "benchmark-results.json"
+REGRESSION_THRESHOLD = 0.2 # fail if a result is more than 20% worse than its baseline
+LOWER_IS_BETTER = ("frame_seconds", "call_seconds")
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def load_script(name):
+    """Import one of the hyphenated scripts next to this file as a module"""
+    module_name = name.replace("-", "_")
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(HERE, name + ".py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+class grid_size:
+    """Temporarily sets a script's GRID_HEIGHT and GRID_WIDTH, which all of its functions read"""
+    def __init__(self, module, height, width):
+        self.module = module
+        self.size = {"GRID_HEIGHT": height, "GRID_WIDTH": width}
+        if hasattr(module, "ITER_PER_SAMPLE"):
+            self.size["ITER_PER_SAMPLE"] = height * width * module.SWEEPS_PER_SAMPLE
+
+    def __enter__(self):
+        self.saved = {name: getattr(self.module, name) for name in self.size}
+        for name, value in self.size.items():
+            setattr(self.module, name, value)
+
+    def __exit__(self, *exc):
+        for name, value in self.saved.items():
+            setattr(self.module, name, value)
+
+def rate(step, budget=TIME_BUDGET):
+    """Calls of step per second, repeating it for about budget seconds (at least once)"""
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        step()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= budget:
+            return calls / elapsed
+
+def result(benchmark, variant, height, width, temperature, metric, value):
+    return {"benchmark": benchmark, "variant": variant, "height": height, "width": width,
+            "temperature": temperature, "metric": metric, "value": value}
+
+def bench_sampler_sweeps(sampler, height, width, temperature, budget):
+    """Sweeps per second of every engine's inner loop at one lattice size"""
+    results = []
+    cells = height * width
+    for engine in ENGINES:
+        if engine in ("reference", "nfold") and cells > PYTHON_MAX_CELLS:
+            continue
+        rng = np.random.default_rng(SEED)
+        with grid_size(sampler, height, width):
+            if engine == "reference":
+                state = {"grid": [[0] * width for _ in range(height)], "mol_num": 0}
+                stream = sampler.RandomStream(cells, SEED)
+                def step():
+                    state["grid"], state["mol_num"] = sampler.glauber_dynamics(temperature, POTENTIAL, state["grid"], state["mol_num"], stream)
+                sweeps = rate(step, budget) / cells
+            elif engine == "nfold":
+                # steps are accepted flips; report the physical sweeps they cover
+                nfold = sampler.NFoldWay([[0] * width for _ in range(height)], temperature, POTENTIAL, sampler.RandomStream(cells, SEED))
+                start = time.perf_counter()
+                steps = 0
+                while time.perf_counter() - start < budget and nfold.step() is not None:
+                    steps += 1
+                elapsed = time.perf_counter() - start
+                sweeps = nfold.clock / elapsed
+                results.append(result("sampler", engine, height, width, temperature, "accepts_per_second", steps / elapsed))
+            elif engine == "packed":
+                lattice = sampler.PackedLattice(height, width)
+                table = sampler.acceptance_table(temperature, POTENTIAL)
+                sweeps = rate(lambda: sampler.packed_sweep(lattice, table, rng), budget)
+            elif engine == "cluster":
+                grid = np.zeros((height, width), dtype=np.int8)
+                coupling, field = sampler.ising_couplings(POTENTIAL, height, width)
+                sweeps = rate(lambda: sampler.cluster_sweep(grid, temperature, coupling, field, rng), budget)
+            else:
+                grid = np.zeros((height, width), dtype=np.int8)
+                table = sampler.acceptance_table(temperature, POTENTIAL)
+                masks = sampler.checkerboard_masks(height, width)
+                sweeps = rate(lambda: sampler.checkerboard_sweep(grid, table, masks, rng), budget)
+        results.append(result("sampler", engine, height, width, temperature, "sweeps_per_second", sweeps))
+        results.append(result("sampler", engine, height, width, temperature, "proposals_per_second", sweeps * cells))
+    return results
+
+def bench_sample_simulate(sampler, temperature, repeats=CALL_REPEATS):
+    """
+    Seconds per sample_simulate call, SWEEPS_PER_SAMPLE sweeps at the script's own grid size.
+    The best of repeats calls: the slower ones only measure whatever else the machine was doing.
+    """
+    results = []
+    for engine in ENGINES:
+        call = lambda: sampler.sample_simulate(temperature, POTENTIAL, engine, SEED)
+        seconds = min(timeit.repeat(call, number=1, repeat=repeats))
+        results.append(result("sample_simulate", engine, sampler.GRID_HEIGHT, sampler.GRID_WIDTH, temperature,
+                              "call_seconds", seconds))
+    return results
+
+def bench_glauber(glauber, height, width, temperature, budget):
+    """Proposals per second of the GUI's LatticeSimulation, one run per dynamics"""
+    results = []
+    with grid_size(glauber, height, width):
+        for dynamics in glauber.DYNAMICS:
+            sim = glauber.LatticeSimulation(temperature, POTENTIAL, dynamics, seed=SEED)
+            step = sim.nfold_dynamics if dynamics == "nfold" else sim.glauber_dynamics
+            start = time.perf_counter()
+            proposals = rate(step, budget)
+            # an n-fold step is one accepted flip standing in for many proposals; its sweeps are physical time
+            sweeps = sim.nfold.clock / (time.perf_counter() - start) if dynamics == "nfold" else proposals / (height * width)
+            results.append(result("glauber", dynamics, height, width, temperature, "proposals_per_second", proposals))
+            results.append(result("glauber", dynamics, height, width, temperature, "sweeps_per_second", sweeps))
+    return results
+
+def bench_kawasaki(kawasaki, height, width, temperature, budget):
+    """
+    Proposals per second of the Kawasaki GUI's LatticeSimulation, one run per exchange mode.
+    Only "tiled" runs on lattices bigger than PYTHON_MAX_CELLS; it proposes every bond once per sweep.
+    """
+    results = []
+    with grid_size(kawasaki, height, width):
+        for mode in kawasaki.EXCHANGE_MODES:
+            if mode != "tiled" and height * width > PYTHON_MAX_CELLS:
+                continue
+            sim = kawasaki.LatticeSimulation(temperature, mode, seed=SEED)
+            if mode == "tiled":
+                sweeps = rate(sim.run_sweep, budget)
+                proposals = sweeps * ((height - 1) * width + height * (width - 1))
+            else:
+                proposals = rate(sim.kawasaki_dynamics, budget)
+                sweeps = proposals / (height * width)
+            results.append(result("kawasaki", mode, height, width, temperature, "proposals_per_second", proposals))
+            results.append(result("kawasaki", mode, height, width, temperature, "sweeps_per_second", sweeps))
+    return results
+
+def bench_render(glauber, height, width, budget):
+    """
+    Seconds per frame of LatticeRenderer pasting into offscreen PIL images, in every render mode.
+    This leaves out the transfer of a Tk PhotoImage to the display, so the GUI's frames cost more.
+    """
+    results = []
+    cell_size = max(1, min(glauber.CELL_SIZE, RENDER_MAX_PIXELS // max(height, width)))
+    rng = np.random.default_rng(SEED)
+    grid = (rng.random((height, width)) < 0.5).astype(np.uint8)
+    changes = max(1, int(RENDER_CHANGE * height * width))
+    for mode in RENDER_MODES:
+        renderer = LatticeRenderer(None, height, width, cell_size, (glauber.WHITE, glauber.CELL_COLOR),
+                                   glauber.GRID_LINE_COLOR, mode)
+        renderer.draw(grid)
+        def frame():
+            rows = rng.integers(height, size=changes)
+            cols = rng.integers(width, size=changes)
+            grid[rows, cols] ^= 1
+            renderer.draw(grid)
+        results.append(result("render_offscreen", mode, height, width, None, "frame_seconds", 1 / rate(frame, budget)))
+    return results
+
+def bench_clusters(sampler, height, width, budget):
+    """Seconds per cluster_stats call, the vectorized labelling the GUIs run on every published frame"""
+    rng = np.random.default_rng(SEED)
+    grid = (rng.random((height, width)) < CLUSTER_DENSITY).astype(np.int8)
+    seconds = 1 / rate(lambda: sampler.cluster_stats(grid), budget)
+    return [result("clusters", "label", height, width, None, "call_seconds", seconds)]
+
+def run(sizes=SIZES, temperatures=TEMPERATURES, budget=TIME_BUDGET):
+    sampler = load_script("glauber-phase-sampler")
+    glauber = load_script("glauber-dynamics")
+    kawasaki = load_script("kawasaki-dynamics")
+
+    results = []
+    for temperature in temperatures:
+        results += bench_sample_simulate(sampler, temperature)
+    for height, width in sizes:
+        print(f"{height}x{width}...")
+        for temperature in temperatures:
+            results += bench_sampler_sweeps(sampler, height, width, temperature, budget)
+            if height * width <= PYTHON_MAX_CELLS:
+                results += bench_glauber(glauber, height, width, temperature, budget)
+            results += bench_kawasaki(kawasaki, height, width, temperature, budget)
+        results += bench_render(glauber, height, width, budget)
+        results += bench_clusters(sampler, height, width, budget)
+    return results
+
+def _key(entry):
+    return (entry["benchmark"], entry["variant"], entry["height"], entry["width"], entry["temperature"], entry["metric"])
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """List (result, baseline value, relative slowdown) of every result worse than its baseline by more than threshold"""
+    previous = {_key(entry): entry["value"] for entry in baseline}
+    regressions = []
+    for entry in results:
+        old = previous.get(_key(entry))
+        if old is None or old <= 0 or entry["value"] <= 0:
+            continue
+        if entry["metric"] in LOWER_IS_BETTER:
+            slowdown = entry["value"] / old - 1
+        else:
+            slowdown = old / entry["value"] - 1
+        if slowdown > threshold:
+            regressions.append((entry, old, slowdown))
+    return regressions
+
+def parse_size(text):
+    height, width = text.lower().split("x")
+    return int(height), int(width)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Glauber, Kawasaki, rendering and cluster labelling hot paths")
+    parser.add_argument("--sizes", type=lambda text: [parse_size(s) for s in text.split(",")], default=SIZES,
+                        help="comma-separated HEIGHTxWIDTH lattice sizes, e.g. 20x40,512x512")
+    parser.add_argument("--temperatures", type=lambda text: [float(t) for t in text.split(",")], default=TEMPERATURES)
+    parser.add_argument("--budget", type=float, default=TIME_BUDGET, help="seconds per measurement")
+    parser.add_argument("--output", default=OUTPUT, help="where to write the results as JSON")
+    parser.add_argument("--baseline", help="results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.temperatures, args.budget)
+    with open(args.output, "w") as f:
+        json.dump({"python": sys.version.split()[0], "numpy": np.__version__, "results": results}, f, indent=1)
+
+    for entry in results:
+        print(f"{entry['benchmark']:>15} {entry['variant']:>12} {entry['height']:>5}x{entry['width']:<5} "
+              f"T={entry['temperature']!s:<4} {entry['metric']:>20} {entry['value']:.4g}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["results"], args.threshold)
+        for entry, old, slowdown in regressions:
+            print(f"REGRESSION {entry['benchmark']} {entry['variant']} {entry['height']}x{entry['width']} "
+                  f"T={entry['temperature']} {entry['metric']}: {old:.4g} -> {entry['value']:.4g} ({slowdown:.0%} slower)")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
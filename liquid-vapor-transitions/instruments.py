@@ -0,0 +1,109 @@
+import contextlib
+import json
+import time
+
+# Opt-in instrumentation shared by glauber-phase-sampler.py, glauber-dynamics.py and kawasaki-dynamics.py.
+# Each script passes its own MOVES and PHASES, and its INSTRUMENT and STATS_EXPORT settings.
+
+class Instruments:
+    """
+    Opt-in counters and phase timers. The engines add proposals, accepted moves by type and sweeps,
+    and the callers add the seconds spent in each phase. All are cumulative, and report() turns the
+    change since the previous report into rates, optionally appending them to an export file: CSV if
+    its name ends in ".csv", otherwise JSON lines. When disabled nothing is counted and timer() does
+    nothing. Pool workers count into their own Instruments and send counts() back to be merged.
+    close() closes the export file; used as a context manager, Instruments close it on exit.
+    """
+    def __init__(self, moves, phases, enabled=False, export=None):
+        self.enabled = enabled
+        self.moves = moves
+        self.phases = phases
+        self.proposals = 0
+        self.sweeps = 0
+        self.accepts = dict.fromkeys(moves, 0)
+        self.seconds = dict.fromkeys(phases, 0.0)
+        self.calls = dict.fromkeys(phases, 0)
+        self.last = self._totals()
+
+        self.export = None
+        if enabled and export is not None:
+            self.export = open(export, "w")
+            if export.endswith(".csv"):
+                self.export.write(",".join(self.fields()) + "\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self.export is not None:
+            self.export.close()
+            self.export = None
+
+    @contextlib.contextmanager
+    def timer(self, phase):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[phase] += time.perf_counter() - start
+            self.calls[phase] += 1
+
+    def counts(self):
+        return self.proposals, self.sweeps, self.accepts, self.seconds, self.calls
+
+    def merge(self, counts):
+        proposals, sweeps, accepts, seconds, calls = counts
+        self.proposals += proposals
+        self.sweeps += sweeps
+        for move in self.moves:
+            self.accepts[move] += accepts[move]
+        for phase in self.phases:
+            self.seconds[phase] += seconds[phase]
+            self.calls[phase] += calls[phase]
+
+    def _totals(self):
+        return (time.perf_counter(), self.proposals, self.sweeps, dict(self.accepts), dict(self.seconds), dict(self.calls))
+
+    def fields(self):
+        return (["time", "sweeps_per_second", "proposals_per_second", "acceptance"]
+                + [f"accept_{move}" for move in self.moves] + [f"{phase}_ms" for phase in self.phases])
+
+    def report(self):
+        """Rates since the previous report: acceptance as fractions of proposals, phases in ms per call"""
+        now, proposals, sweeps, accepts, seconds, calls = self._totals()
+        then, last_proposals, last_sweeps, last_accepts, last_seconds, last_calls = self.last
+        self.last = (now, proposals, sweeps, accepts, seconds, calls)
+
+        elapsed = max(now - then, 1e-9)
+        proposed = max(proposals - last_proposals, 1)
+        record = {
+            "time": time.time(),
+            "sweeps_per_second": (sweeps - last_sweeps) / elapsed,
+            "proposals_per_second": (proposals - last_proposals) / elapsed,
+            "acceptance": sum(accepts[move] - last_accepts[move] for move in self.moves) / proposed,
+        }
+        for move in self.moves:
+            record[f"accept_{move}"] = (accepts[move] - last_accepts[move]) / proposed
+        for phase in self.phases:
+            record[f"{phase}_ms"] = 1000 * (seconds[phase] - last_seconds[phase]) / max(calls[phase] - last_calls[phase], 1)
+
+        if self.export is not None:
+            if self.export.name.endswith(".csv"):
+                self.export.write(",".join(str(record[field]) for field in self.fields()) + "\n")
+            else:
+                self.export.write(json.dumps(record) + "\n")
+            self.export.flush()
+        return record
+
+    def hud(self, record):
+        """The report as three lines of text for the GUIs' on-canvas HUD"""
+        accepts = ", ".join(f"{move} {record[f'accept_{move}']:.1%}" for move in self.moves)
+        phases = "  ".join(f"{phase} {record[f'{phase}_ms']:.1f} ms" for phase in self.phases)
+        return (f"{record['sweeps_per_second']:.1f} sweeps/s  {record['proposals_per_second']:.3g} proposals/s\n"
+                f"accepted {record['acceptance']:.1%} ({accepts})\n{phases}")
@@ -1,8 +1,16 @@
 import tkinter as tk
 import time
 import numpy as np
-import random
 import math
+import os
+from instruments import Instruments
+from trajectory import TrajectoryWriter, Trajectory
+from random_stream import RandomStream
+from lattice import count_neighbors_at, bond_count
+from observables import ObservableSeries
+from tiled_kawasaki import domino_sets, exchange_table, tiled_sweep
+from clusters import ClusterSeries, cluster_stats, cluster_text
+from lattice_view import TARGET_FPS, LatticeRenderer, save_lattice, load_lattice, SimulationWorker
 
 # --- Grid Constants ---
 GRID_WIDTH = 20     # Number of cells horizontally
@@ -17,6 +25,47 @@ TEMP_INIT = 0.01
 TEMP_MAX = 1.0
 TEMP_MIN = 0.01
 
+# --- Exchange Modes ---
+# "nonlocal": swap any molecule with any empty cell
+# "local": a molecule hops to a neighboring empty cell
+# "tiled": local hops decided with NumPy for a whole set of non-interacting bonds at once (tiled_sweep);
+#          the grid is then a NumPy array and big grids (1024x1024) become practical
+EXCHANGE_MODES = ("nonlocal", "local", "tiled")
+EXCHANGE_MODE = "nonlocal"
+ACCEPTANCE_RULES = ("glauber", "metropolis") # of "tiled": q/(1+q) as in kawasaki_dynamics, or min(1, q)
+ACCEPTANCE_RULE = "glauber"
+
+# --- Random Numbers ---
+SEED = None # seed of the simulation's RandomStream; None for a different run every time
+
+# --- Instrumentation ---
+# Off by default. When on, the simulation counts proposals and accepted moves, the worker and the
+# GUI time each phase, and a HUD on the canvas shows the rates every STATS_INTERVAL seconds
+INSTRUMENT = False
+STATS_EXPORT = None # file to stream the HUD figures to: CSV if it ends in ".csv", otherwise JSON lines
+STATS_INTERVAL = 1.0
+MOVES = ("hop", "jump") # accepted exchanges between neighboring cells / distant cells
+PHASES = ("messages", "sweeps", "publish", "draw") # worker: messages, sweeps, publish; GUI: draw
+
+# --- Trajectories ---
+# RECORD names a directory to record the run to as a trajectory, one frame every RECORD_INTERVAL sweeps;
+# REPLAY names a recorded trajectory to scrub through instead of simulating
+RECORD = None
+RECORD_INTERVAL = 1
+REPLAY = None
+
+# --- Cluster Analysis ---
+# Off by default. When on, the simulation labels the clusters of molecules of every snapshot the worker
+# publishes and the canvas shows the no. of droplets, the largest cluster's share of the grid and
+# whether some cluster spans it; the simulation's cluster_series keeps them over time. A droplet is a
+# cluster of at least clusters.py's DROPLET_MIN_SIZE molecules that does not touch two opposite edges
+CLUSTERS = False
+
+# --- Saved Lattices ---
+# The Save and Load buttons write the worker's current lattice to LATTICE_FILE, with its temperature and
+# sweep, and read it back, so an equilibrated state can be picked up again instead of re-equilibrated
+LATTICE_FILE = "lattice.npz"
+
 # Colors
 WHITE = "#ffffff" 
 BLACK = "#000000"
@@ -24,13 +73,16 @@ GRID_LINE_COLOR = "#c8c8c8"
 CELL_COLOR = "#34cfeb" 
 KNOB_COLOR = "#e63946"
 
+# --- Rendering ---
+RENDER_MODE = "full" # one of lattice_view.py's RENDER_MODES
+
 class Coordinate:
     def __init__(self, x_coord, y_coord):
         self.x = x_coord
         self.y = y_coord
 
-def populate():
-    p = random.random()
+def populate(rng):
+    p = rng.uniform()
     if p <= DENSITY:
         return 1
     else:
@@ -40,7 +92,7 @@ def total_energy(g):
         energy = 0
         for row in range(GRID_HEIGHT):
             for col in range(GRID_WIDTH):
-                energy += count_neighbors(Coordinate(row,col),g)
+                energy += count_neighbors(Coordinate(col,row),g)
         return -1 * energy / 2
 
 """If a cell is a molecule, count how many of its neightbors is also a molecule:"""
@@ -60,25 +112,327 @@ def count_neighbors(coord, g):
             count += 1
         return count
 
+"""Count how many of its neightbors is also a molecule, regardless if the cell is 0 or 1"""
+def nonselective_count_neighbors(coord, g):
+        count = 0
+        col = coord.x
+        row = coord.y
+        if row > 0 and g[row-1][col] == 1:
+            count += 1
+        if col > 0 and g[row][col-1] == 1:
+            count += 1
+        if row < GRID_HEIGHT - 1 and g[row+1][col] == 1:
+            count += 1
+        if col < GRID_WIDTH - 1 and g[row][col+1] == 1:
+            count += 1
+        return count
+
+"""Like nonselective_count_neighbors, for a cell given by row and col instead of a Coordinate"""
+"""
+Cells are indexed row * GRID_WIDTH + col. Bonds between horizontal neighbors (row, col)-(row, col+1)
+are indexed row * GRID_WIDTH + col, and between vertical neighbors (row, col)-(row+1, col)
+GRID_WIDTH * GRID_HEIGHT + row * GRID_WIDTH + col.
+"""
+def all_bonds():
+    bonds = [row * GRID_WIDTH + col for row in range(GRID_HEIGHT) for col in range(GRID_WIDTH - 1)]
+    bonds += [GRID_WIDTH * GRID_HEIGHT + row * GRID_WIDTH + col for row in range(GRID_HEIGHT - 1) for col in range(GRID_WIDTH)]
+    return bonds
+
+def bond_cells(bond):
+    if bond < GRID_WIDTH * GRID_HEIGHT:
+        return bond, bond + 1
+    bond -= GRID_WIDTH * GRID_HEIGHT
+    return bond, bond + GRID_WIDTH
+
+def cell_bonds(index):
+    row, col = divmod(index, GRID_WIDTH)
+    bonds = []
+    if col > 0:
+        bonds.append(index - 1)
+    if col < GRID_WIDTH - 1:
+        bonds.append(index)
+    if row > 0:
+        bonds.append(GRID_WIDTH * GRID_HEIGHT + index - GRID_WIDTH)
+    if row < GRID_HEIGHT - 1:
+        bonds.append(GRID_WIDTH * GRID_HEIGHT + index)
+    return bonds
+
+class SiteSet:
+    """
+    Set of cell or bond indices with O(1) add, discard and uniform random choice:
+    a list of the members plus the position of each member in that list.
+    """
+    def __init__(self, items=()):
+        self.items = []
+        self.positions = {}
+        for item in items:
+            self.add(item)
+
+    def add(self, item):
+        if item not in self.positions:
+            self.positions[item] = len(self.items)
+            self.items.append(item)
+
+    def discard(self, item):
+        position = self.positions.pop(item, None)
+        if position is None:
+            return
+        last = self.items.pop()
+        if last != item:
+            self.items[position] = last
+            self.positions[last] = position
+
+    def choice(self, rng):
+        return self.items[rng.randrange(len(self.items))]
+
+    def __contains__(self, item):
+        return item in self.positions
+
+    def __len__(self):
+        return len(self.items)
+
+class LatticeSimulation:
+    """
+    The headless simulation core: grid, observables, site index and dynamics, with no Tk involved.
+    Temperature is a plain attribute changed through set_parameters.
+    """
+    def __init__(self, temperature=TEMP_INIT, exchange_mode=EXCHANGE_MODE, instruments=None, seed=SEED, clusters=CLUSTERS):
+        # --- Grid Data Structure ---
+        # The same 2D list to hold the state of our simulation
+        self.rng = RandomStream(GRID_WIDTH * GRID_HEIGHT, seed)
+        self.grid = [[populate(self.rng) for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
+        self.temperature = temperature
+        self.exchange_mode = exchange_mode
+        if exchange_mode == "tiled":
+            self.grid = np.array(self.grid, dtype=np.int8)
+            self.domino_sets = domino_sets(GRID_HEIGHT, GRID_WIDTH)
+
+        # --- Observables ---
+        # Counted once here, then kept up to date from the delta of every accepted move
+        if exchange_mode == "tiled":
+            self.mol_num = int(self.grid.sum())
+            self.bonds = bond_count(self.grid)
+        else:
+            self.mol_num = sum(map(sum, self.grid))
+            self.bonds = int(-total_energy(self.grid)) # no. of neighboring molecule pairs
+        self.sweep = 0
+        self.series = ObservableSeries()
+        self.instruments = instruments if instruments is not None else Instruments(MOVES, PHASES, enabled=False)
+        # Labelled from scratch and summarized into cluster_series whenever record_clusters is called
+        self.clusters = clusters
+        self.cluster_series = ClusterSeries()
+
+        # --- Site Index ---
+        # Molecules, empty cells and molecule-empty bonds, so every proposal is a valid exchange;
+        # "tiled" proposes every bond anyway and needs none
+        self.occupied = self.empty = self.active_bonds = None
+        if exchange_mode != "tiled":
+            self._index_sites()
+
+    def set_parameters(self, temperature):
+        self.temperature = temperature
+
+    """Toggles the state of a cell, keeping the observables and the site index up to date."""
+    def toggle_cell(self, row, col):
+        self.set_cell(row * GRID_WIDTH + col, 1 - self.grid[row][col])
+
+    """Labels the clusters of the grid, appends their summary to cluster_series and returns it, or None without clusters."""
+    def record_clusters(self):
+        if not self.clusters:
+            return None
+        summary = cluster_stats(np.asarray(self.grid, dtype=np.uint8)).summary()
+        self.cluster_series.append(self.sweep, *summary)
+        return summary
+
+    """Writes the grid, temperature and sweep to an .npz file, through a temporary file renamed into place."""
+    def save(self, path):
+        save_lattice(path, self.grid, temperature=self.temperature, sweep=self.sweep)
+
+    """Replaces the cells of the grid with those of a saved lattice and recounts everything kept from them."""
+    def load_grid(self, cells, sweep=0):
+        if self.exchange_mode == "tiled":
+            self.grid[...] = cells
+            self.mol_num = int(self.grid.sum())
+            self.bonds = bond_count(self.grid)
+        else:
+            for row, values in zip(self.grid, np.asarray(cells).tolist()):
+                row[:] = values
+            self.mol_num = sum(map(sum, self.grid))
+            self.bonds = int(-total_energy(self.grid))
+            self._index_sites()
+        self.sweep = sweep
+
+    """Builds the site index from the grid."""
+    def _index_sites(self):
+        self.occupied = SiteSet(i for i in range(GRID_WIDTH * GRID_HEIGHT) if self.cell_state(i) == 1)
+        self.empty = SiteSet(i for i in range(GRID_WIDTH * GRID_HEIGHT) if self.cell_state(i) == 0)
+        self.active_bonds = SiteSet(b for b in all_bonds() if self._bond_active(b))
+
+    """Energy of the current grid, -bonds, in O(1)."""
+    def energy(self):
+        return -self.bonds
+
+    """Return a random 0-indexed cell (row, col) on the grid"""
+    def random_cell(self):
+        return divmod(self.rng.site(), GRID_WIDTH)
+
+    def cell_state(self, index):
+        return self.grid[index // GRID_WIDTH][index % GRID_WIDTH]
+
+    def _bond_active(self, bond):
+        a, b = bond_cells(bond)
+        return self.cell_state(a) != self.cell_state(b)
+
+    def _count_neighbors(self, index):
+        return count_neighbors_at(self.grid, index // GRID_WIDTH, index % GRID_WIDTH)
+
+    """Sets one cell and updates the observables and the site index to match."""
+    def set_cell(self, index, state):
+        if self.cell_state(index) == state:
+            return
+        change = 1 if state == 1 else -1
+        self.bonds += change * self._count_neighbors(index)
+        self.mol_num += change
+        self.grid[index // GRID_WIDTH][index % GRID_WIDTH] = state
+        if self.occupied is None:
+            return
+
+        if state == 1:
+            self.occupied.add(index)
+            self.empty.discard(index)
+        else:
+            self.empty.add(index)
+            self.occupied.discard(index)
+        for bond in cell_bonds(index):
+            if self._bond_active(bond):
+                self.active_bonds.add(bond)
+            else:
+                self.active_bonds.discard(bond)
+
+    """Change in the no. of active bonds if molecule c1 moved to empty cell c2, without moving it."""
+    def _active_bond_change(self, c1, c2):
+        def state_after(index):
+            return 1 - self.cell_state(index) if index in (c1, c2) else self.cell_state(index)
+
+        change = 0
+        for bond in set(cell_bonds(c1)) | set(cell_bonds(c2)):
+            a, b = bond_cells(bond)
+            change += (state_after(a) != state_after(b)) - (self.cell_state(a) != self.cell_state(b))
+        return change
+
+    """
+    Moves a molecule into an empty cell. The pair is drawn from the site index, so there are no
+    wasted proposals: "nonlocal" picks any molecule and any empty cell, "local" any molecule-empty
+    bond. The energy change is computed before touching the grid.
+    Returns "hop" or "jump" if the move was accepted, for the instruments.
+    """
+    def kawasaki_dynamics(self):
+        temperature = self.temperature
+        if temperature <= 0: return # Avoid division by zero
+
+        if self.exchange_mode == "local":
+            if not self.active_bonds: return
+            c1, c2 = bond_cells(self.active_bonds.choice(self.rng))
+            if self.cell_state(c1) == 0:
+                c1, c2 = c2, c1
+        else:
+            if not self.occupied or not self.empty: return
+            c1 = self.occupied.choice(self.rng)
+            c2 = self.empty.choice(self.rng)
+
+        # c1 is the molecule, c2 the empty cell; if they touch, c1 no longer counts as c2's neighbor
+        adjacent = abs(c1 - c2) == GRID_WIDTH or (abs(c1 - c2) == 1 and c1 // GRID_WIDTH == c2 // GRID_WIDTH)
+        delta_bonds = self._count_neighbors(c2) - adjacent - self._count_neighbors(c1)
+        q = math.exp(delta_bonds / temperature)
+
+        if self.exchange_mode == "local":
+            # The no. of bonds to choose from changes with the move; correct for it (Hastings)
+            active = len(self.active_bonds)
+            q *= active / (active + self._active_bond_change(c1, c2))
+        threshold = q/(1+q)
+
+        if self.rng.uniform() <= threshold:
+            self.set_cell(c1, 0)
+            self.set_cell(c2, 1)
+            return "hop" if adjacent else "jump"
+
+    """Runs GRID_WIDTH * GRID_HEIGHT steps of the dynamics and records the observables."""
+    def run_sweep(self):
+        if self.exchange_mode == "tiled":
+            self._tiled_sweep()
+        elif self.instruments.enabled:
+            self._counted_sweep()
+        else:
+            for _ in range(GRID_WIDTH * GRID_HEIGHT):
+                self.kawasaki_dynamics()
+        self.sweep += 1
+        self.series.append(self.sweep, self.mol_num, self.bonds, self.energy())
+
+    """run_sweep for "tiled": every bond is proposed once and every exchange is a hop."""
+    def _tiled_sweep(self):
+        table = exchange_table(self.temperature, ACCEPTANCE_RULE)
+        bond_change, exchanges = tiled_sweep(self.grid, table, self.domino_sets, self.rng.generator)
+        self.bonds += bond_change
+        if self.instruments.enabled:
+            self.instruments.proposals += (GRID_HEIGHT - 1) * GRID_WIDTH + GRID_HEIGHT * (GRID_WIDTH - 1)
+            self.instruments.accepts["hop"] += exchanges
+            self.instruments.sweeps += 1
+
+    """run_sweep's loop with counting, by the move kawasaki_dynamics reports as accepted."""
+    def _counted_sweep(self):
+        accepts = dict.fromkeys(MOVES, 0)
+        for _ in range(GRID_WIDTH * GRID_HEIGHT):
+            move = self.kawasaki_dynamics()
+            if move is not None:
+                accepts[move] += 1
+
+        instruments = self.instruments
+        instruments.proposals += GRID_WIDTH * GRID_HEIGHT
+        for move, count in accepts.items():
+            instruments.accepts[move] += count
+        instruments.sweeps += 1
+
 class GridSimulation:
     def __init__(self, root):
         self.root = root
         self.root.title("Kawasaki dynamics")
 
-        # --- Grid Data Structure ---
-        # The same 2D list to hold the state of our simulation
-        self.grid = [[populate() for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
+        # --- Simulation Core ---
+        # The dynamics run in a worker thread; this class only draws and forwards input
+        self.instruments = Instruments(MOVES, PHASES, INSTRUMENT, STATS_EXPORT)
+        self.sim = LatticeSimulation(instruments=self.instruments)
+        recording = TrajectoryWriter(RECORD, GRID_HEIGHT, GRID_WIDTH) if RECORD is not None and REPLAY is None else None
+        self.worker = SimulationWorker(self.sim, recording, RECORD_INTERVAL)
+
+        # --- Replay ---
+        # With a trajectory to replay the worker is never started and the frame slider drives the canvas
+        self.trajectory = None
+        if REPLAY is not None:
+            self.trajectory = Trajectory(REPLAY)
+            if (self.trajectory.height, self.trajectory.width) != (GRID_HEIGHT, GRID_WIDTH):
+                raise ValueError(f"{REPLAY} is a {self.trajectory.height}x{self.trajectory.width} trajectory, "
+                                 f"the grid is {GRID_HEIGHT}x{GRID_WIDTH}")
 
         # --- Tkinter Canvas Setup ---
         self.canvas = tk.Canvas(root, width=SCREEN_WIDTH, height=SCREEN_HEIGHT, bg=WHITE)
         self.canvas.pack()
 
-        # A 2D list to hold the ID of each rectangle on the canvas
-        self.rectangles = [[None for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
-
-        self.create_grid_rectangles()
+        self.renderer = LatticeRenderer(self.canvas, GRID_HEIGHT, GRID_WIDTH, CELL_SIZE, (WHITE, CELL_COLOR), GRID_LINE_COLOR,
+                                        RENDER_MODE)
+        self.drawn_version = None
         self.draw_grid()
 
+        # --- Instrumentation HUD ---
+        # Created after the lattice images so it stays on top of them
+        if self.instruments.enabled:
+            self.hud_id = self.canvas.create_text(4, 4, anchor=tk.NW, fill=BLACK, font=("TkFixedFont", 8))
+            self.last_report = time.perf_counter()
+
+        # --- Cluster Readout ---
+        if CLUSTERS:
+            self.cluster_id = self.canvas.create_text(4, SCREEN_HEIGHT - 4, anchor=tk.SW, fill=BLACK,
+                                                      font=("TkFixedFont", 8))
+
          # --- Controls Frame ---
         # A frame to hold all the sliders and controls neatly
         controls_frame = tk.Frame(root)
@@ -95,39 +449,82 @@ class GridSimulation:
             to=TEMP_MAX,                
             orient=tk.HORIZONTAL,     
             label="Temperature", 
-            resolution=0.01
+            resolution=0.01,
+            command=self._on_temperature_change
         )
         self.slider.pack(side=tk.BOTTOM, fill=tk.X, padx=5, pady=5)
+
+        # --- Saved Lattice ---
+        if self.trajectory is None:
+            self.setup_lattice_buttons(controls_frame)
         
         # Bind mouse click event to a handler function
         self.canvas.bind("<Button-1>", self.handle_mouse_click)
 
         # --- Simulation Loop ---
         self.running = True
+        if self.trajectory is None:
+            self.worker.start()
+        else:
+            self.setup_replay(controls_frame)
         self.update_simulation() # Start the loop
 
-    """Creates the rectangle objects on the canvas once at the start."""
-    def create_grid_rectangles(self):
-        for row in range(GRID_HEIGHT):
-            for col in range(GRID_WIDTH):
-                x1 = col * CELL_SIZE
-                y1 = row * CELL_SIZE
-                x2 = x1 + CELL_SIZE
-                y2 = y1 + CELL_SIZE
-                # Create a rectangle and store its ID in our rectangles list
-                self.rectangles[row][col] = self.canvas.create_rectangle(
-                    x1, y1, x2, y2, fill=WHITE, outline=GRID_LINE_COLOR
-                )
-
-    """Updates the color of the rectangles on the canvas based on the grid data."""
+    """Forwards a new slider temperature to the worker."""
+    def _on_temperature_change(self, value):
+        self.worker.send("parameters", float(value))
+
+    """Creates the buttons that save the lattice to LATTICE_FILE and load it back."""
+    def setup_lattice_buttons(self, parent_frame):
+        buttons_frame = tk.Frame(parent_frame)
+        buttons_frame.pack(side=tk.BOTTOM)
+        tk.Button(buttons_frame, text="Save lattice", command=self.save_lattice).pack(side=tk.LEFT)
+        tk.Button(buttons_frame, text="Load lattice", command=self.load_lattice).pack(side=tk.LEFT)
+
+    """Has the worker save its lattice to LATTICE_FILE between two sweeps."""
+    def save_lattice(self):
+        self.worker.send("save", LATTICE_FILE)
+
+    """Hands the lattice in LATTICE_FILE to the worker and moves the slider to its temperature."""
+    def load_lattice(self):
+        if not os.path.exists(LATTICE_FILE):
+            return
+        cells, fields = load_lattice(LATTICE_FILE, GRID_HEIGHT, GRID_WIDTH)
+        self.worker.send("load", cells, fields["sweep"])
+        self.temperature.set(fields["temperature"])
+        self.worker.send("parameters", fields["temperature"])
+
+    """Creates the frame slider of replay mode and shows the first frame."""
+    def setup_replay(self, parent_frame):
+        self.frame_var = tk.IntVar(value=0)
+        self.frame_sweep_var = tk.StringVar()
+        tk.Scale(
+            parent_frame,
+            variable=self.frame_var,
+            from_=0,
+            to=max(len(self.trajectory) - 1, 0),
+            orient=tk.HORIZONTAL,
+            label="Frame",
+            command=self._on_frame_change
+        ).pack(side=tk.BOTTOM, fill=tk.X, padx=5, pady=5)
+        tk.Label(parent_frame, textvariable=self.frame_sweep_var).pack(side=tk.BOTTOM)
+        if len(self.trajectory):
+            self._on_frame_change(0)
+
+    """Shows one frame of the replayed trajectory."""
+    def _on_frame_change(self, value):
+        index = int(value)
+        frame = self.trajectory.frame(index)
+        self.renderer.draw(frame)
+        self.frame_sweep_var.set(f"Sweep {self.trajectory.sweeps[index]}")
+        if CLUSTERS:
+            self.canvas.itemconfigure(self.cluster_id, text=cluster_text(cluster_stats(frame).summary()))
+
+    """Redraws the lattice image from the latest snapshot, if the worker has published a new one."""
     def draw_grid(self):
-        for row in range(GRID_HEIGHT):
-            for col in range(GRID_WIDTH):
-                cell_state = self.grid[row][col]
-                rect_id = self.rectangles[row][col]
-                color = CELL_COLOR if cell_state == 1 else WHITE
-                # Use itemconfig to efficiently change the rectangle's fill color
-                self.canvas.itemconfig(rect_id, fill=color)
+        snapshot, version = self.worker.snapshot()
+        if version != self.drawn_version:
+            self.renderer.draw(snapshot)
+            self.drawn_version = version
 
     """Toggles the state of a cell when clicked."""
     def handle_mouse_click(self, event):
@@ -136,57 +533,37 @@ class GridSimulation:
         
         if 0 <= row < GRID_HEIGHT and 0 <= col < GRID_WIDTH:
             # Toggle the state (0 to 1, or 1 to 0)
-            self.grid[row][col] = 1 - self.grid[row][col]
-
-    """Return a random 0-indexed cell (x : horizontal (col),y: vertical (row)) on the grid"""
-    def random_cell(self):
-        return Coordinate(random.randint(0,GRID_WIDTH-1), random.randint(0,GRID_HEIGHT-1))
+            self.worker.send("toggle", row, col)
 
-    def kawasaki_dynamics(self):
-        temperature = float(self.temperature.get())
-        if temperature <= 0: return # Avoid division by zero
-
-        c1 = self.random_cell()
-        c2 = self.random_cell()
-
-        # # If only one is a molecule
-        if self.grid[c1.y][c1.x] != self.grid[c2.y][c2.x]:
-
-            e0 = -1 * (count_neighbors(c1, self.grid) + count_neighbors(c2, self.grid))
-            self.grid[c1.y][c1.x] = not self.grid[c1.y][c1.x]
-            self.grid[c2.y][c2.x] = not self.grid[c2.y][c2.x]
-            e1 = -1 * (count_neighbors(c1, self.grid) + count_neighbors(c2, self.grid))
-
-            q = math.exp((e0 - e1)/float(self.temperature.get()))
-            threshold = q/(1+q)
-
-            if not random.random() <= threshold: # if it doesnt meet threshold, flip it back to original state
-                self.grid[c1.y][c1.x] = not self.grid[c1.y][c1.x]
-                self.grid[c2.y][c2.x] = not self.grid[c2.y][c2.x]
-
-
-    """This is the main loop for the simulation."""
+    """This is the main loop of the GUI; the simulation itself runs in self.worker."""
     def update_simulation(self):
         if not self.running:
+            self.worker.stop()
             return
         
-        # --- Run multiple simulation steps per frame ---
-        steps_per_frame = GRID_WIDTH * GRID_HEIGHT
-        for _ in range(steps_per_frame):
-            self.kawasaki_dynamics()
-        
         # --- Drawing ---
-        # We only draw once after all the simulation steps are done.
-        self.draw_grid()
+        with self.instruments.timer("draw"):
+            self.draw_grid()
+        if CLUSTERS and self.trajectory is None:
+            self.canvas.itemconfigure(self.cluster_id, text=cluster_text(self.worker.cluster_summary))
+
+        # --- Instrumentation ---
+        if self.instruments.enabled and time.perf_counter() - self.last_report >= STATS_INTERVAL:
+            self.canvas.itemconfigure(self.hud_id, text=self.instruments.hud(self.instruments.report()))
+            self.last_report = time.perf_counter()
         
         # --- Schedule the next update ---
-        # 1 ms for minimal delays
-        self.root.after(1, self.update_simulation)
+        self.root.after(int(1000 / TARGET_FPS), self.update_simulation)
 
 def main():
     root = tk.Tk()
     app = GridSimulation(root)
     root.mainloop()
+    # let the worker finish its batch and close the trajectory it is recording
+    app.worker.stop()
+    if app.worker.is_alive():
+        app.worker.join()
+    app.instruments.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
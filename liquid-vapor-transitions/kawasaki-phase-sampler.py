@@ -0,0 +1,193 @@
+import numpy as np
+import math
+import os
+import json
+from lattice import bond_count
+from tiled_kawasaki import domino_sets, exchange_table, tiled_sweep
+from pool import run_tasks
+
+GRID_WIDTH = 128
+GRID_HEIGHT = 128
+TEMP_MAX = 1.0
+TEMP_MIN = 0.3 # colder quenches barely coarsen within SWEEPS
+DENSITY_MAX = 0.5
+DENSITY_MIN = 0.05
+SWEEPS = 2048 # length of every quench, in sweeps
+DIAGRAM_RESOLUTION = 6 # no. of ticks of the (temperature, density) diagram
+
+# --- Dynamics ---
+# Local Kawasaki exchanges vectorized over non-interacting domino sets by tiled_kawasaki.py,
+# as in kawasaki-dynamics.py's "tiled" mode
+ACCEPTANCE_RULES = ("glauber", "metropolis") # q/(1+q) as in kawasaki_dynamics, or min(1, q)
+ACCEPTANCE_RULE = "glauber"
+
+# --- Measurements ---
+# Every quench starts from a random grid at its density; S(k) and the domain length L(t) are
+# measured at logarithmically spaced sweeps, so late times of coarsening cost no more disk than early ones
+MEASUREMENTS_PER_DECADE = 10
+FIT_START = 0.1 # coarsening_exponent fits L(t) over sweeps from FIT_START * SWEEPS on
+# The grid's edges are open but the FFT treats it as periodic, so the jump between opposite edges adds
+# spurious power along the k axes. "hann" tapers the fluctuations to zero towards the edges first; None does not
+WINDOWS = ("hann", None)
+WINDOW = "hann"
+
+# --- Output ---
+OUTPUT_DIR = "kawasaki-runs" # one JSON-lines file per diagram point and seed, written as the quench runs
+
+# --- Parallel Sweep ---
+SEED = 2024 # root seed; every diagram point gets its own stream spawned from it
+WORKERS = None # size of the process pool, None for one worker per core
+
+def quench_grid(density, rng, height=GRID_HEIGHT, width=GRID_WIDTH):
+    """A random grid with exactly round(density * cells) molecules, as after a quench from infinite temperature"""
+    cells = height * width
+    grid = np.zeros(cells, dtype=np.int8)
+    grid[rng.permutation(cells)[:round(density * cells)]] = 1
+    return grid.reshape(height, width)
+
+def measurement_sweeps(sweeps=SWEEPS, per_decade=MEASUREMENTS_PER_DECADE):
+    """Sweeps 1..sweeps spaced evenly in log time, per_decade of them per factor of ten"""
+    count = int(math.ceil(math.log10(sweeps) * per_decade)) + 1
+    return np.unique(np.rint(np.logspace(0, math.log10(sweeps), count)).astype(int))
+
+class StructureFactor:
+    """
+    Circularly averaged structure factor of a height x width grid. The FFT wave vectors are binned
+    into shells of width 2 pi / max(height, width); k holds the mean |k| of every non-empty shell
+    but the k = 0 one, which only carries the density. With window "hann" the density fluctuations
+    are multiplied by a 2D Hann window before the FFT, as the open edges are not periodic.
+    """
+    def __init__(self, height=GRID_HEIGHT, width=GRID_WIDTH, window=WINDOW):
+        self.window = np.outer(np.hanning(height), np.hanning(width)) if window == "hann" else np.ones((height, width))
+        self.norm = np.sum(self.window**2)
+        ky = 2 * np.pi * np.fft.fftfreq(height)[:, None]
+        kx = 2 * np.pi * np.fft.fftfreq(width)[None, :]
+        magnitude = np.sqrt(kx**2 + ky**2)
+        shells = np.rint(magnitude / (2 * np.pi / max(height, width))).astype(int).ravel()
+        self.counts = np.bincount(shells)
+        self.keep = np.flatnonzero(self.counts)[1:]
+        self.shells = shells
+        self.k = (np.bincount(shells, weights=magnitude.ravel())[self.keep] / self.counts[self.keep])
+
+    def __call__(self, grid):
+        """S(k) on the shells of self.k: |FFT of the windowed density fluctuations|^2 per cell, shell averaged"""
+        fluctuation = (grid - np.average(grid, weights=self.window)) * self.window
+        power = np.abs(np.fft.fft2(fluctuation))**2 / self.norm
+        return np.bincount(self.shells, weights=power.ravel())[self.keep] / self.counts[self.keep]
+
+def domain_length(k, s):
+    """Characteristic domain size 2 pi / <k> from the first moment of S(k)"""
+    total = np.sum(s)
+    return 2 * np.pi * total / np.sum(k * s) if total > 0 else math.nan
+
+def seed_tag(seed):
+    """A SeedSequence as text for file names, its entropy then its spawn key: 2024-5 is the sixth child of 2024"""
+    return "-".join(str(n) for n in (seed.entropy, *seed.spawn_key))
+
+def run_path(output_dir, temp, density, seed):
+    return os.path.join(output_dir, f"T{temp:.4f}_density{density:.4f}_seed{seed_tag(seed)}.jsonl")
+
+def quench(temp, density, seed=None, sweeps=SWEEPS, output_dir=OUTPUT_DIR, rule=ACCEPTANCE_RULE, window=WINDOW):
+    """
+    Quench a random grid at density to temp and run it for sweeps sweeps of tiled Kawasaki dynamics.
+    At every measurement_sweeps() sweep, S(k), the domain length and the bonds are appended to the
+    run's JSON-lines file under output_dir, named by the point and the seed, and flushed, so a run
+    can be followed while it goes. The first line holds the parameters and the shells' k.
+    seed is an int, a SeedSequence or None for fresh entropy. Returns the final (length, bonds per cell).
+    """
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    rng = np.random.default_rng(seed)
+    grid = quench_grid(density, rng)
+    sets = domino_sets(GRID_HEIGHT, GRID_WIDTH)
+    table = exchange_table(temp, rule)
+    structure_factor = StructureFactor(window=window)
+    bonds = bond_count(grid)
+
+    length = math.nan
+    with open(run_path(output_dir, temp, density, seed), "w") as f:
+        header = {"temperature": temp, "density": density, "seed": seed_tag(seed), "height": GRID_HEIGHT,
+                  "width": GRID_WIDTH, "sweeps": sweeps, "rule": rule, "window": window, "k": structure_factor.k.tolist()}
+        f.write(json.dumps(header) + "\n")
+        measure = set(measurement_sweeps(sweeps).tolist())
+        for sweep in range(1, sweeps + 1):
+            bonds += tiled_sweep(grid, table, sets, rng)[0]
+            if sweep in measure:
+                s = structure_factor(grid)
+                length = domain_length(structure_factor.k, s)
+                f.write(json.dumps({"sweep": sweep, "bonds": bonds, "length": length, "s": s.tolist()}) + "\n")
+                f.flush()
+    return length, bonds / grid.size
+
+def load_run(path):
+    """The header of a quench's file and its measurements as arrays: sweep, bonds, length and s (one row per sweep)"""
+    with open(path) as f:
+        header = json.loads(f.readline())
+        rows = [json.loads(line) for line in f if line.strip()]
+    header["k"] = np.array(header["k"])
+    run = {name: np.array([row[name] for row in rows]) for name in ("sweep", "bonds", "length", "s")}
+    return header, run
+
+def coarsening_exponent(sweeps, lengths, start=None):
+    """Slope of log L against log t from sweep start on (default FIT_START of the run); 1/3 for Lifshitz-Slyozov"""
+    sweeps = np.asarray(sweeps, dtype=float)
+    lengths = np.asarray(lengths, dtype=float)
+    if start is None:
+        start = FIT_START * sweeps[-1]
+    fit = (sweeps >= start) & np.isfinite(lengths)
+    if np.count_nonzero(fit) < 2:
+        return math.nan
+    return float(np.polyfit(np.log(sweeps[fit]), np.log(lengths[fit]), 1)[0])
+
+def diagram_point(resolution, row, col):
+    """(temperature, density) of one point of a resolution x resolution diagram"""
+    temp_step = (TEMP_MAX - TEMP_MIN) / max(resolution - 1, 1)
+    density_step = (DENSITY_MAX - DENSITY_MIN) / max(resolution - 1, 1)
+    return TEMP_MIN + col * temp_step, DENSITY_MAX - row * density_step
+
+def _quench_point(task):
+    row, col, temp, density, seed, sweeps, output_dir = task
+    return row, col, quench(temp, density, seed, sweeps, output_dir)
+
+def diagram_seeds(resolution=DIAGRAM_RESOLUTION, seed=SEED):
+    """The SeedSequence children of seed for the points of a resolution x resolution diagram, row by row"""
+    return np.random.SeedSequence(seed).spawn(resolution * resolution)
+
+def sweep_diagram(resolution=DIAGRAM_RESOLUTION, seed=SEED, sweeps=SWEEPS, workers=WORKERS, output_dir=OUTPUT_DIR):
+    """
+    Quench every point of the (temperature, density) diagram on a process pool, each from its own
+    diagram_seeds() child of seed. Rows go down from DENSITY_MAX, columns go right from TEMP_MIN; both
+    ends are included. Every point streams its measurements to its own file under output_dir.
+    Returns the final domain lengths and bonds per cell as resolution x resolution arrays.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    points = [(row, col) + diagram_point(resolution, row, col) for row in range(resolution) for col in range(resolution)]
+    seeds = diagram_seeds(resolution, seed)
+    tasks = [point + (s, sweeps, output_dir) for point, s in zip(points, seeds)]
+
+    lengths = np.zeros((resolution, resolution))
+    bonds = np.zeros((resolution, resolution))
+    for row, col, (length, bonds_per_cell) in run_tasks(_quench_point, tasks, workers):
+        lengths[row, col] = length
+        bonds[row, col] = bonds_per_cell
+    return lengths, bonds
+
+def main():
+    lengths, bonds = sweep_diagram()
+    print(f"final domain length after {SWEEPS} sweeps (rows: density down from {DENSITY_MAX}, columns: T up from {TEMP_MIN})")
+    for row in lengths:
+        print(np.round(row, 2).tolist())
+
+    print("coarsening exponents")
+    seeds = diagram_seeds()
+    for row in range(DIAGRAM_RESOLUTION):
+        exponents = []
+        for col in range(DIAGRAM_RESOLUTION):
+            seed = seeds[row * DIAGRAM_RESOLUTION + col]
+            _, run = load_run(run_path(OUTPUT_DIR, *diagram_point(DIAGRAM_RESOLUTION, row, col), seed))
+            exponents.append(round(coarsening_exponent(run["sweep"], run["length"]), 3))
+        print(exponents)
+
+
+if __name__ == "__main__":
+    main()
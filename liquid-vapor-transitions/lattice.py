@@ -0,0 +1,38 @@
+import numpy as np
+
+# Counting on the lattice gas's grid with open edges, shared by glauber-phase-sampler.py,
+# glauber-dynamics.py, kawasaki-dynamics.py, kawasaki-phase-sampler.py, nfold.py and tiled_kawasaki.py.
+# Unlike lattice_view.py it needs no display.
+
+def count_neighbors_at(g, row, col):
+    """
+    Number of the nearest neighbors of the cell at row and col that hold a molecule, on a 2D list or
+    array g: nonselective_count_neighbors for a cell given by row and col, without a Coordinate
+    """
+    count = 0
+    if row > 0 and g[row-1][col] == 1:
+        count += 1
+    if col > 0 and g[row][col-1] == 1:
+        count += 1
+    if row < len(g) - 1 and g[row+1][col] == 1:
+        count += 1
+    if col < len(g[0]) - 1 and g[row][col+1] == 1:
+        count += 1
+    return count
+
+def neighbor_sum(grid):
+    """
+    Count the occupied neighbors of every cell at once with array shifts, over the last two axes,
+    so a stack of grids (R, H, W) is counted grid by grid. Edges are open, exactly like
+    nonselective_count_neighbors.
+    """
+    neighbors = np.zeros(grid.shape, dtype=np.int8)
+    neighbors[..., 1:, :] += grid[..., :-1, :]
+    neighbors[..., :-1, :] += grid[..., 1:, :]
+    neighbors[..., :, 1:] += grid[..., :, :-1]
+    neighbors[..., :, :-1] += grid[..., :, 1:]
+    return neighbors
+
+def bond_count(grid):
+    """Number of nearest-neighbor pairs that are both molecules, for a NumPy grid"""
+    return int(np.count_nonzero(grid[1:, :] & grid[:-1, :]) + np.count_nonzero(grid[:, 1:] & grid[:, :-1]))
@@ -0,0 +1,181 @@
+import os
+import queue
+import tempfile
+import threading
+import time
+import tkinter as tk
+import numpy as np
+from PIL import Image, ImageTk
+
+# The lattice view, saved lattices and simulation thread shared by glauber-dynamics.py and kawasaki-dynamics.py.
+# Each script passes its own colors, cell size and render mode, and runs its own LatticeSimulation in a
+# SimulationWorker.
+
+# --- Rendering ---
+# "full": repaint the whole lattice image every frame
+# "dirty": repaint only the tiles with changed cells; best for big, mostly still grids
+RENDER_MODES = ("full", "dirty")
+RENDER_TILE = 32 # cells per side of a tile in "dirty" mode
+GRID_LINE_MIN_CELL_SIZE = 4 # smaller cells are drawn without grid lines
+
+# --- Worker ---
+TARGET_FPS = 30 # how often the GUI redraws, and so how often the worker publishes a snapshot
+WORKER_BATCH_TIME = 0.02 # seconds of sweeps between checks for slider and click messages
+
+def hex_to_rgb(color):
+    return tuple(int(color[i:i+2], 16) for i in (1, 3, 5))
+
+class LatticeRenderer:
+    """
+    Draws the lattice as images on the canvas, built from a NumPy buffer, instead of one
+    rectangle per cell. "full" repaints a single image every frame; "dirty" splits the lattice
+    into RENDER_TILE x RENDER_TILE cell tiles and repaints only the tiles that changed.
+    colors are the hex colors of an empty and an occupied cell.
+    With canvas None the tiles are plain PIL images, so frames can be drawn offscreen without a display.
+    """
+    def __init__(self, canvas, height, width, cell_size, colors, line_color, mode="full"):
+        self.cell_size = cell_size
+        self.mode = mode
+        self.tile = RENDER_TILE if mode == "dirty" else max(height, width)
+        self.palette = np.array([hex_to_rgb(color) for color in colors], dtype=np.uint8)
+        self.line_color = np.array(hex_to_rgb(line_color), dtype=np.uint8)
+        self.previous = None
+
+        # One PhotoImage per tile, keyed by the (row, col) of its top-left cell
+        self.photos = {}
+        for top in range(0, height, self.tile):
+            for left in range(0, width, self.tile):
+                rows = min(self.tile, height - top)
+                cols = min(self.tile, width - left)
+                if canvas is None:
+                    photo = Image.new("RGB", (cols * cell_size, rows * cell_size))
+                else:
+                    photo = ImageTk.PhotoImage("RGB", (cols * cell_size, rows * cell_size))
+                    canvas.create_image(left * cell_size, top * cell_size, anchor=tk.NW, image=photo)
+                self.photos[(top, left)] = photo
+
+    """Scales a block of cells up to pixels, with grid lines if cells are big enough to show them."""
+    def pixels(self, cells):
+        pixels = self.palette[cells].repeat(self.cell_size, axis=0).repeat(self.cell_size, axis=1)
+        if self.cell_size >= GRID_LINE_MIN_CELL_SIZE:
+            pixels[::self.cell_size, :] = self.line_color
+            pixels[:, ::self.cell_size] = self.line_color
+        return pixels
+
+    def draw(self, grid):
+        cells = np.asarray(grid, dtype=np.uint8)
+        for (top, left), photo in self.photos.items():
+            block = cells[top:top + self.tile, left:left + self.tile]
+            if self.mode == "dirty" and self.previous is not None and \
+                    np.array_equal(block, self.previous[top:top + self.tile, left:left + self.tile]):
+                continue
+            photo.paste(Image.fromarray(self.pixels(block)))
+        self.previous = cells.copy()
+
+def save_lattice(path, grid, **fields):
+    """Writes the grid and fields (temperature, sweep, ...) to an .npz file, through a temporary file renamed into place"""
+    fd, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez_compressed(f, grid=np.array(grid, dtype=np.uint8), **fields)
+        os.replace(temporary, path)
+    except BaseException:
+        os.remove(temporary)
+        raise
+
+def load_lattice(path, height, width):
+    """(cells, fields) of a lattice saved by save_lattice, fields as a dict; raises unless it is height x width"""
+    with np.load(path) as data:
+        cells = data["grid"]
+        if cells.shape != (height, width):
+            raise ValueError(f"{path} holds a {cells.shape[0]}x{cells.shape[1]} lattice, the grid is {height}x{width}")
+        return cells, {name: data[name].item() for name in data.files if name != "grid"}
+
+class SimulationWorker(threading.Thread):
+    """
+    Runs a LatticeSimulation in a background thread so the Tk loop never waits on it.
+    The GUI talks to it only through messages ("parameters", "toggle", "save", "load") and
+    reads lattice snapshots from a double buffer: the worker fills the back buffer and swaps it
+    to the front under a lock, so a reader always gets a complete sweep.
+    Given a TrajectoryWriter, it records a frame every record_interval sweeps and closes it on stop.
+    Every published snapshot comes with the simulation's record_clusters(), None unless it tracks clusters.
+    """
+    def __init__(self, sim, trajectory=None, record_interval=1):
+        super().__init__(daemon=True)
+        self.sim = sim
+        self.trajectory = trajectory
+        self.record_interval = record_interval
+        self.messages = queue.Queue()
+        self.lock = threading.Lock()
+        self.buffers = [np.zeros(np.shape(sim.grid), dtype=np.uint8) for _ in range(2)]
+        self.front = 0
+        self.version = 0 # incremented on every published snapshot
+        self.sweeps_per_second = 0.0
+        self.running = True
+        self.cluster_summary = None
+        self.publish()
+
+    def send(self, message, *args):
+        self.messages.put((message, args))
+
+    def stop(self):
+        self.running = False
+
+    """Copies the grid into the back buffer and swaps it to the front."""
+    def publish(self):
+        back = 1 - self.front
+        self.buffers[back][...] = self.sim.grid
+        self.cluster_summary = self.sim.record_clusters()
+        with self.lock:
+            self.front = back
+            self.version += 1
+
+    """Returns a copy of the latest published grid and its version."""
+    def snapshot(self):
+        with self.lock:
+            return self.buffers[self.front].copy(), self.version
+
+    def _handle_messages(self):
+        while True:
+            try:
+                message, args = self.messages.get_nowait()
+            except queue.Empty:
+                return
+            if message == "parameters":
+                self.sim.set_parameters(*args)
+            elif message == "toggle":
+                self.sim.toggle_cell(*args)
+            elif message == "save":
+                self.sim.save(*args)
+            elif message == "load":
+                self.sim.load_grid(*args)
+
+    def run(self):
+        sweeps = 1
+        last_publish = time.perf_counter()
+        timer = self.sim.instruments.timer
+        while self.running:
+            with timer("messages"):
+                self._handle_messages()
+
+            start = time.perf_counter()
+            with timer("sweeps"):
+                for _ in range(sweeps):
+                    self.sim.run_sweep()
+                    if self.trajectory is not None and self.sim.sweep % self.record_interval == 0:
+                        self.trajectory.record(self.sim.grid, self.sim.sweep)
+            elapsed = time.perf_counter() - start
+            if elapsed > 0:
+                self.sweeps_per_second = sweeps / elapsed
+            # Size the next batch so it takes about WORKER_BATCH_TIME: long enough that the loop
+            # overhead vanishes, short enough that slider changes apply without visible lag
+            sweeps = max(1, int(self.sweeps_per_second * WORKER_BATCH_TIME))
+
+            # Only copy out as many snapshots as the GUI can show
+            if time.perf_counter() - last_publish >= 1 / TARGET_FPS:
+                with timer("publish"):
+                    self.publish()
+                last_publish = time.perf_counter()
+
+        if self.trajectory is not None:
+            self.trajectory.close()
@@ -0,0 +1,121 @@
+import math
+from random_stream import RandomStream
+from lattice import count_neighbors_at
+
+# The n-fold way engine shared by glauber-phase-sampler.py's "nfold" engine and glauber-dynamics.py's "nfold" dynamics.
+
+class NFoldWay:
+    """
+    Rejection-free Glauber dynamics (n-fold way, Bortz-Kalos-Lebowitz). Every cell is in one of
+    10 classes by (state, occupied neighbors), and a class flips at the Metropolis acceptance
+    probability of glauber_dynamics. Each step picks a class by its total rate, flips a random
+    cell of it and advances clock (in sweeps) by the waiting time the original dynamics would
+    have spent rejecting proposals. The grid is a list of lists and is updated in place.
+    """
+    def __init__(self, grid, temperature, potential, rng=None):
+        self.grid = grid
+        self.height = len(grid)
+        self.width = len(grid[0])
+        self.rng = rng if rng is not None else RandomStream(self.height * self.width)
+        self.clock = 0.0
+
+        # members[c] lists the cells of class c = state * 5 + neighbors; position[i] is where cell i sits in its list
+        self.members = [[] for _ in range(10)]
+        self.position = [0] * (self.height * self.width)
+        self.cell_class = [0] * (self.height * self.width)
+        for index in range(self.height * self.width):
+            self.cell_class[index] = self._class_of(index)
+            self._insert(index)
+
+        self.temperature = None
+        self.potential = None
+        self.set_parameters(temperature, potential)
+
+    """Refreshes the per-class rates; a no-op unless temperature or potential changed."""
+    def set_parameters(self, temperature, potential):
+        if temperature == self.temperature and potential == self.potential:
+            return
+        self.temperature = temperature
+        self.potential = potential
+        self.rates = []
+        for state in (0, 1):
+            for neighbors in range(5):
+                delta_e = -(1 - 2 * state) * (neighbors + potential)
+                self.rates.append(math.exp(-max(delta_e, 0) / temperature) if temperature > 0 else 0.0)
+
+    def _class_of(self, index):
+        row, col = divmod(index, self.width)
+        return self.grid[row][col] * 5 + count_neighbors_at(self.grid, row, col)
+
+    def _insert(self, index):
+        members = self.members[self.cell_class[index]]
+        self.position[index] = len(members)
+        members.append(index)
+
+    def _remove(self, index):
+        members = self.members[self.cell_class[index]]
+        last = members.pop()
+        if last != index:
+            members[self.position[index]] = last
+            self.position[last] = self.position[index]
+
+    def _reclassify(self, index):
+        new_class = self._class_of(index)
+        if new_class != self.cell_class[index]:
+            self._remove(index)
+            self.cell_class[index] = new_class
+            self._insert(index)
+
+    """Must be called after a cell of grid is changed from outside, e.g. by a mouse click."""
+    def cell_changed(self, row, col):
+        index = row * self.width + col
+        self._reclassify(index)
+        for neighbor in self._neighbor_cells(index):
+            self._reclassify(neighbor)
+
+    def _neighbor_cells(self, index):
+        row, col = divmod(index, self.width)
+        cells = []
+        if row > 0:
+            cells.append(index - self.width)
+        if col > 0:
+            cells.append(index - 1)
+        if row < self.height - 1:
+            cells.append(index + self.width)
+        if col < self.width - 1:
+            cells.append(index + 1)
+        return cells
+
+    """
+    Flips one cell. Returns (row, col, change in no. of neighboring molecule pairs), or None if
+    no cell can flip at all or the flip would come after until (in sweeps); clock then stops at
+    until, which the memoryless waiting time makes exact.
+    """
+    def step(self, until=math.inf):
+        weights = [len(members) * rate for members, rate in zip(self.members, self.rates)]
+        total = sum(weights)
+        wait = -math.log(1.0 - self.rng.random()) / total if total > 0 else math.inf
+        if self.clock + wait > until:
+            self.clock = until
+            return None
+        if total <= 0:
+            return None
+        self.clock += wait
+
+        x = self.rng.random() * total
+        chosen = None
+        for c, weight in enumerate(weights):
+            if weight > 0:
+                chosen = c
+                if x < weight:
+                    break
+                x -= weight
+        members = self.members[chosen]
+        index = members[self.rng.randrange(len(members))]
+
+        row, col = divmod(index, self.width)
+        state = self.grid[row][col]
+        neighbors = chosen % 5
+        self.grid[row][col] = 1 - state
+        self.cell_changed(row, col)
+        return row, col, (1 - 2 * state) * neighbors
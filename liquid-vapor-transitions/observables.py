@@ -0,0 +1,34 @@
+import numpy as np
+
+# Per-sweep observable records of the GUIs' simulations, shared by glauber-dynamics.py and kawasaki-dynamics.py.
+
+SERIES_CAPACITY = 4096 # no. of per-sweep observable records kept
+
+class ObservableSeries:
+    """
+    Fixed-size ring buffer of per-sweep observables, so they can be plotted and averaged
+    without rescanning the grid. Once full, the oldest records are overwritten.
+    """
+    FIELDS = ("sweep", "mol_num", "bonds", "energy")
+
+    def __init__(self, capacity=SERIES_CAPACITY):
+        self.capacity = capacity
+        self.data = np.zeros((capacity, len(self.FIELDS)))
+        self.count = 0
+
+    def append(self, *record):
+        self.data[self.count % self.capacity] = record
+        self.count += 1
+
+    def records(self):
+        """Stored records, oldest first, as a (n, len(FIELDS)) array"""
+        if self.count <= self.capacity:
+            return self.data[:self.count]
+        start = self.count % self.capacity
+        return np.concatenate((self.data[start:], self.data[:start]))
+
+    def column(self, name):
+        return self.records()[:, self.FIELDS.index(name)]
+
+    def __len__(self):
+        return min(self.count, self.capacity)
@@ -0,0 +1,99 @@
+import glob
+import os
+import tempfile
+import numpy as np
+
+# The result store glauber-phase-sampler.py sweeps into, and the readers of glauber-phase-diagram-make.py
+# and glauber-dynamics.py. Every sampled point is saved as one .npy record named by the hash of
+# everything that determines it, so re-running a sweep only simulates the points that are missing.
+
+STORE_DIR = "phase-store"
+MODEL = "glauber-lattice-gas"
+STORE_DTYPE = np.dtype([
+    ("model", "U32"), ("height", "i4"), ("width", "i4"), ("engine", "U32"), ("temperature", "f8"),
+    ("potential", "f8"), ("density", "f8"), ("error", "f8"), ("sweeps", "i8"),
+    ("equilibration_sweeps", "i8"), ("tau", "f8"),
+])
+ADAPTIVE_PREFIX = "adaptive-" # sweep_diagram_adaptive records an engine as this followed by its name
+
+# --- Diagram ---
+# The bounds of the sampler's diagram; diagram_point places its points by them and store_raster finds them again
+TEMP_MAX = 2.0
+TEMP_MIN = 0.01
+POTENTIAL_MAX = -1.0
+POTENTIAL_MIN = -3.0
+
+# --- Readers ---
+# Only results of one engine on one lattice size are shown together, both its fixed-length and its adaptive ones
+STORE_ENGINE = "checkerboard" # the sampler's ENGINE
+STORE_HEIGHT = 20 # the sampler's GRID_HEIGHT
+STORE_WIDTH = 40 # the sampler's GRID_WIDTH
+STORE_RESOLUTION = 10 # the sampler's DIAGRAM_RESOLUTION
+
+class ResultStore:
+    """
+    Directory of sampled points, one STORE_DTYPE record per .npy file named by its store key.
+    A record is written to a temporary file next to its final path and renamed into place,
+    so any number of processes can fill the same store and a reader never sees half a record.
+    """
+    def __init__(self, directory=STORE_DIR):
+        self.directory = directory
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".npy")
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def get(self, key):
+        """The record stored under key, or None"""
+        try:
+            return np.load(self._path(key))[0]
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, record):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, np.array([record], dtype=STORE_DTYPE))
+            os.replace(temporary, path)
+        except BaseException:
+            os.remove(temporary)
+            raise
+
+    def records(self):
+        """Every stored record as one structured array"""
+        paths = sorted(glob.glob(os.path.join(self.directory, "*", "*.npy")))
+        return np.concatenate([np.load(path) for path in paths]) if paths else np.zeros(0, dtype=STORE_DTYPE)
+
+def load_store(directory=STORE_DIR, model=MODEL, engine=STORE_ENGINE, height=STORE_HEIGHT, width=STORE_WIDTH):
+    """
+    Every record of the store at directory for model on a height x width lattice, sampled by engine
+    with a fixed number of sweeps or adaptively, as one structured array, or None if there are none
+    """
+    records = ResultStore(directory).records()
+    records = records[(records["model"] == model) & np.isin(records["engine"], (engine, ADAPTIVE_PREFIX + engine))
+                      & (records["height"] == height) & (records["width"] == width)]
+    return records if len(records) else None
+
+def store_raster(records, resolution=STORE_RESOLUTION):
+    """
+    Densities (0-1) at the points of a resolution x resolution diagram placed as by the sampler's
+    diagram_point, rows down from POTENTIAL_MAX and columns right from TEMP_MIN. Records off those
+    points (other resolutions) are left out, points sampled more than once (other seeds, or both
+    fixed-length and adaptive) are averaged and points with no record are NaN.
+    """
+    cols = (records["temperature"] - TEMP_MIN) / ((TEMP_MAX - TEMP_MIN) / resolution)
+    rows = (POTENTIAL_MAX - records["potential"]) / ((POTENTIAL_MAX - POTENTIAL_MIN) / resolution)
+    keep = ((np.abs(cols - np.rint(cols)) < 1e-6) & (np.abs(rows - np.rint(rows)) < 1e-6)
+            & (np.rint(cols) >= 0) & (np.rint(cols) < resolution) & (np.rint(rows) >= 0) & (np.rint(rows) < resolution))
+    index = (np.rint(rows[keep]).astype(int), np.rint(cols[keep]).astype(int))
+    total = np.zeros((resolution, resolution))
+    count = np.zeros((resolution, resolution))
+    np.add.at(total, index, records["density"][keep])
+    np.add.at(count, index, 1)
+    with np.errstate(invalid="ignore"):
+        return total / count
@@ -0,0 +1,15 @@
+import multiprocessing
+
+# The process pool glauber-phase-sampler.py and kawasaki-phase-sampler.py sweep their diagrams on.
+
+def run_tasks(func, tasks, workers=None):
+    """
+    Yield func(task) for every task as soon as it finishes, one task at a time per pool worker.
+    workers is the size of the pool, None for one worker per core; with 1 the tasks run in this process.
+    """
+    if workers == 1:
+        yield from map(func, tasks)
+        return
+
+    with multiprocessing.Pool(workers) as pool:
+        yield from pool.imap_unordered(func, tasks, chunksize=1)
@@ -0,0 +1,29 @@
+import functools
+import numpy as np
+
+# Buffered random numbers for the pure-Python update loops of glauber-phase-sampler.py,
+# glauber-dynamics.py and kawasaki-dynamics.py.
+
+RANDOM_BLOCK = 4096 # random numbers drawn from NumPy at a time by a RandomStream
+
+class RandomStream:
+    """
+    Random numbers for the pure-Python update loops, drawn from a NumPy Generator RANDOM_BLOCK
+    at a time, so a proposal costs a next() on a list iterator instead of random-module calls and
+    a Coordinate. site() gives a cell index in [0, cells) and uniform() a float in [0, 1).
+    Seeded with an int or a SeedSequence, a run is bit-reproducible; spawn SeedSequence children
+    for workers or replicas. random() and randrange(n) let it stand in for the random module.
+    """
+    def __init__(self, cells, seed=None, block=RANDOM_BLOCK):
+        self.generator = np.random.default_rng(seed)
+        self.site = functools.partial(next, self._blocks(lambda: self.generator.integers(cells, size=block)))
+        self.uniform = functools.partial(next, self._blocks(lambda: self.generator.random(block)))
+        self.random = self.uniform
+
+    @staticmethod
+    def _blocks(draw):
+        while True:
+            yield from draw().tolist()
+
+    def randrange(self, n):
+        return int(self.uniform() * n)
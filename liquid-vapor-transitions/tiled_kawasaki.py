@@ -0,0 +1,57 @@
+import numpy as np
+from lattice import neighbor_sum
+
+# Local Kawasaki exchanges vectorized over non-interacting domino sets: the "tiled" exchange mode of
+# kawasaki-dynamics.py and the engine of kawasaki-phase-sampler.py. Grids are NumPy arrays with open edges.
+
+def domino_sets(height, width):
+    """
+    Split the bonds of a height x width grid into 12 sets of dominoes that do not interact: no cell
+    of a domino neighbors a cell of another domino of its set, so a whole set can be exchanged at
+    once from the same neighbor counts. Horizontal dominoes are taken every other row and every
+    third column, vertical ones every third row and every other column; each bond is in one set.
+    A set is a pair of index tuples selecting the first and the second cells of its dominoes.
+    """
+    sets = []
+    for row in range(2):
+        for col in range(3):
+            sets.append(((slice(row, None, 2), slice(col, width - 1, 3)),
+                         (slice(row, None, 2), slice(col + 1, width, 3))))
+    for row in range(3):
+        for col in range(2):
+            sets.append(((slice(row, height - 1, 3), slice(col, None, 2)),
+                         (slice(row + 1, height, 3), slice(col, None, 2))))
+    return sets
+
+def exchange_table(temperature, rule="glauber"):
+    """
+    Acceptance probability of an exchange that changes the no. of bonds by -3..3, at index change + 3.
+    rule is "glauber", q/(1+q) with q = exp(change / temperature), or "metropolis", min(1, q).
+    """
+    if temperature <= 0:
+        return np.zeros(7)
+    q = np.exp(np.arange(-3, 4) / temperature)
+    return q / (1 + q) if rule == "glauber" else np.minimum(q, 1.0)
+
+def tiled_sweep(grid, table, sets, rng):
+    """
+    One Kawasaki sweep of a NumPy grid: the domino sets are visited in a random order and every
+    molecule-empty domino of a set is exchanged at once with probability table[change + 3].
+    Every bond is proposed once per sweep and the no. of molecules never changes.
+    Returns the change in the no. of bonds and the no. of exchanges.
+    """
+    bond_change = 0
+    exchanges = 0
+    for i in rng.permutation(len(sets)):
+        first, second = sets[i]
+        neighbors = neighbor_sum(grid)
+        a = grid[first]
+        b = grid[second]
+        # The molecule leaves its cell for the other one and stops counting its old cell as a neighbor
+        change = (neighbors[second] - neighbors[first]) * (a - b) - 1
+        swap = (a != b) & (rng.random(a.shape) < table[change + 3])
+        a ^= swap # a and b are views into grid
+        b ^= swap
+        bond_change += int(change[swap].sum())
+        exchanges += int(np.count_nonzero(swap))
+    return bond_change, exchanges
@@ -0,0 +1,95 @@
+import json
+import os
+import numpy as np
+
+# Trajectory files shared by glauber-phase-sampler.py, glauber-dynamics.py and kawasaki-dynamics.py:
+# the sampler and the GUIs record with TrajectoryWriter, the GUIs replay with Trajectory.
+
+KEYFRAME_INTERVAL = 500 # frames between whole-lattice keyframes; showing a frame replays at most this many deltas
+
+class TrajectoryWriter:
+    """
+    Appends lattice frames to a trajectory directory. Each frame stores only the indices
+    (row * width + col) of the cells that changed since the previous frame, in flips.bin, and every
+    keyframe_interval-th frame is also stored whole, bit-packed, in keyframes.bin. offsets.bin holds
+    where each frame's indices end and sweeps.bin the sweep it was taken at. Read it with Trajectory.
+    """
+    def __init__(self, path, height, width, keyframe_interval=KEYFRAME_INTERVAL):
+        os.makedirs(path, exist_ok=True)
+        self.height = height
+        self.width = width
+        self.keyframe_interval = keyframe_interval
+        self.index_dtype = np.dtype(np.uint16 if height * width <= 2**16 else np.uint32)
+        with open(os.path.join(path, "header.json"), "w") as f:
+            json.dump({"height": height, "width": width, "keyframe_interval": keyframe_interval,
+                       "index_dtype": self.index_dtype.str}, f)
+        self.files = {name: open(os.path.join(path, name + ".bin"), "wb")
+                      for name in ("flips", "offsets", "keyframes", "sweeps")}
+        self.frames = 0
+        self.flips = 0
+        self.previous = np.zeros(height * width, dtype=np.uint8)
+
+    def record(self, grid, sweep):
+        cells = np.asarray(grid, dtype=np.uint8).reshape(-1)
+        changed = np.flatnonzero(cells != self.previous)
+        self.files["flips"].write(changed.astype(self.index_dtype).tobytes())
+        self.flips += len(changed)
+        self.files["offsets"].write(np.int64(self.flips).tobytes())
+        self.files["sweeps"].write(np.int64(sweep).tobytes())
+        if self.frames % self.keyframe_interval == 0:
+            self.files["keyframes"].write(np.packbits(cells).tobytes())
+            self.flush()
+        self.previous = cells.copy()
+        self.frames += 1
+
+    def flush(self):
+        for f in self.files.values():
+            f.flush()
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class Trajectory:
+    """
+    Random access to a trajectory written by TrajectoryWriter, through memory maps of its files.
+    frame(i) unpacks the keyframe at or before i and replays the flips recorded since.
+    """
+    def __init__(self, path):
+        with open(os.path.join(path, "header.json")) as f:
+            header = json.load(f)
+        self.height = header["height"]
+        self.width = header["width"]
+        self.keyframe_interval = header["keyframe_interval"]
+
+        def mapped(name, dtype):
+            filename = os.path.join(path, name + ".bin")
+            if os.path.getsize(filename) == 0:
+                return np.zeros(0, dtype=dtype)
+            return np.memmap(filename, dtype=dtype, mode="r")
+        self.flips = mapped("flips", np.dtype(header["index_dtype"]))
+        self.offsets = mapped("offsets", np.int64)
+        self.sweeps = mapped("sweeps", np.int64)
+        keyframe_bytes = (self.height * self.width + 7) // 8
+        keyframes = mapped("keyframes", np.uint8)
+        self.keyframes = keyframes[:len(keyframes) // keyframe_bytes * keyframe_bytes].reshape(-1, keyframe_bytes)
+
+    def __len__(self):
+        # a frame is complete once its keyframe (if any) and its offset are both on disk
+        return min(len(self.offsets), len(self.sweeps), len(self.keyframes) * self.keyframe_interval)
+
+    def frame(self, index):
+        """The lattice at frame index as a (height, width) uint8 array"""
+        if not 0 <= index < len(self):
+            raise IndexError(f"frame {index} out of range for a trajectory of {len(self)} frames")
+        keyframe = index // self.keyframe_interval
+        cells = np.unpackbits(self.keyframes[keyframe], count=self.height * self.width)
+        start = self.offsets[keyframe * self.keyframe_interval]
+        np.bitwise_xor.at(cells, self.flips[start:self.offsets[index]], 1)
+        return cells.reshape(self.height, self.width)